@@ -0,0 +1,141 @@
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from multiprocessing import Pool, Queue
+
+from crossword import *
+from generate import CrosswordCreator
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python batch.py (jobs.jsonl | -) solutions [output_directory] [workers]")
+
+    # Parse command-line arguments; each job line is {"structure": path, "words": path},
+    # optionally with its own "solutions" limit
+    source = sys.argv[1]
+    limit = int(sys.argv[2])
+    output = sys.argv[3] if len(sys.argv) > 3 else None
+    workers = int(sys.argv[4]) if len(sys.argv) > 4 else os.cpu_count()
+
+    f = sys.stdin if source == "-" else open(source)
+    with f:
+        jobs = [json.loads(line) for line in f if line.strip()]
+    if output:
+        os.makedirs(output, exist_ok=True)
+
+    start = time.perf_counter()
+    total = 0
+    for record in generate_batch(jobs, limit, output, workers):
+        print(json.dumps(record), flush=True)
+        if "grid" in record:
+            total += 1
+    elapsed = time.perf_counter() - start
+    print(f"{total} solutions for {len(jobs)} structures in {elapsed:.2f}s",
+          file=sys.stderr)
+
+
+def generate_batch(jobs, limit, output=None, workers=None):
+    """
+    Solve every job, a dictionary with "structure" and "words" file names
+    (and optionally its own "solutions" limit), in a pool of `workers`
+    processes, finding up to `limit` solutions per job.
+
+    Yield a JSON-serializable record for each solution as soon as any worker
+    finds it, and a summary record when each job finishes. If `output` is a
+    directory, each solution is also saved there as a PNG by a thread of
+    this process, so rendering never holds up the solvers.
+    """
+    queue = Queue()
+    creators = dict()
+    with Pool(workers, initializer=connect, initargs=(queue,)) as pool, \
+            ThreadPoolExecutor() as renderer:
+        for number, job in enumerate(jobs):
+            pool.apply_async(solve_job, ((number, job, job.get("solutions", limit)),))
+        renders = []
+
+        pending = len(jobs)
+        while pending:
+            kind, number, record, words = queue.get()
+            job = jobs[number]
+            record = dict(job=number, structure=job["structure"], words=job["words"], **record)
+
+            if kind == "solution" and output:
+                # rebuild the assignment here and render it off the solvers' critical path
+                key = (job["structure"], job["words"])
+                if key not in creators:
+                    creators[key] = CrosswordCreator(Crossword(*key))
+                assignment = {
+                    Variable(i, j, direction, len(word)): word
+                    for i, j, direction, word in words
+                }
+                name = os.path.splitext(os.path.basename(job["structure"]))[0]
+                record["image"] = os.path.join(
+                    output, f"{number}-{name}-{record['solution']}.png"
+                )
+                renders.append((record["image"], renderer.submit(
+                    creators[key].save, assignment, record["image"]
+                )))
+            elif kind != "solution":
+                pending -= 1
+            yield record
+
+        # report any image that could not be written
+        for image, render in renders:
+            if render.exception() is not None:
+                e = render.exception()
+                yield {"image": image, "error": f"{type(e).__name__}: {e}"}
+
+
+def connect(queue):
+    """
+    Give a worker process the queue it streams results back on.
+    """
+    global results
+    results = queue
+
+
+def solve_job(arguments):
+    """
+    Enumerate the solutions of one job in a worker process, putting each on
+    the results queue as soon as it is found, followed by a summary, or by
+    an error if the job fails.
+    """
+    number, job, limit = arguments
+
+    # a job that fails still reports back, after any solutions it already
+    # queued, so the stream always ends and no solution is lost
+    try:
+        start = time.perf_counter()
+        creator = CrosswordCreator(Crossword(job["structure"], job["words"]))
+        count = 0
+        for assignment in creator.solutions(limit):
+            letters = creator.letter_grid(assignment)
+            grid = [
+                "".join(
+                    (letters[i][j] or " ") if creator.crossword.structure[i][j] else "#"
+                    for j in range(creator.crossword.width)
+                )
+                for i in range(creator.crossword.height)
+            ]
+            words = [
+                (var.i, var.j, var.direction, word)
+                for var, word in assignment.items()
+            ]
+            results.put(("solution", number, {"solution": count, "grid": grid}, words))
+            count += 1
+        results.put(("done", number, {
+            "solutions": count,
+            "nodes": creator.nodes,
+            "seconds": time.perf_counter() - start
+        }, None))
+    except Exception as e:
+        results.put(("error", number, {"error": f"{type(e).__name__}: {e}"}, None))
+
+
+if __name__ == "__main__":
+    main()
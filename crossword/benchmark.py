@@ -0,0 +1,111 @@
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from crossword import *
+from generate import CrosswordCreator, SearchLimit
+
+
+# Search configurations compared, as keyword arguments to CrosswordCreator
+CONFIGURATIONS = {
+    "backtrack": {"inference": None},
+    "forward": {"inference": "forward"},
+    "mac": {"inference": "mac"},
+    "mac+domwdeg": {"inference": "mac", "heuristic": "domwdeg"},
+    "backjump": {"engine": "backjump"},
+}
+
+# Generated grids, as (height, width, seed), solved with the largest word list
+GENERATED = [(7, 7, 0), (9, 9, 1), (11, 11, 2), (13, 13, 3)]
+
+COLUMNS = ["nodes", "backtracks", "revisions", "pruned", "ac3 seconds", "search seconds"]
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [report.jsonl] [node_limit]")
+    report = sys.argv[1] if len(sys.argv) > 1 else None
+    node_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    structures = sorted(glob.glob(os.path.join(directory, "data", "structure*.txt")))
+    words = sorted(glob.glob(os.path.join(directory, "data", "words*.txt")))
+    problems = [(structure, word_file) for structure in structures for word_file in words]
+
+    with tempfile.TemporaryDirectory() as generated:
+        for height, width, seed in GENERATED:
+            structure = os.path.join(generated, f"generated{height}x{width}.txt")
+            with open(structure, "w") as f:
+                f.write(random_structure(height, width, seed))
+            problems.append((structure, words[-1]))
+
+        print(f"{'structure':<22}{'words':<12}{'configuration':<14}{'result':<8}"
+              + "".join(f"{column:>16}" for column in COLUMNS))
+        records = []
+        for structure, word_file in problems:
+            for name, configuration in CONFIGURATIONS.items():
+                record = benchmark(structure, word_file, configuration, node_limit)
+                record.update(configuration=name)
+                records.append(record)
+                print(f"{record['structure']:<22}{record['words']:<12}{name:<14}{record['result']:<8}"
+                      + "".join(f"{format_value(record[column]):>16}" for column in COLUMNS))
+
+    if report:
+        with open(report, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+
+def benchmark(structure, word_file, configuration, node_limit):
+    """
+    Solve one crossword with one configuration, stopping after `node_limit`
+    search nodes, and return a record of its search statistics.
+    """
+    crossword = Crossword(structure, word_file)
+    creator = CrosswordCreator(crossword, **configuration)
+    creator.node_limit = node_limit
+    start = time.perf_counter()
+    try:
+        result = "solved" if creator.solve() is not None else "none"
+    except SearchLimit:
+        result = "limit"
+    record = {
+        "structure": os.path.basename(structure),
+        "words": os.path.basename(word_file),
+        "variables": len(crossword.variables),
+        "result": result,
+        "seconds": time.perf_counter() - start
+    }
+    record.update(creator.statistics())
+    return record
+
+
+def random_structure(height, width, seed, density=0.4):
+    """
+    Return the text of a random crossword structure of the given size, in
+    the format of data/structure*.txt, with about `density` of its cells
+    blocked and the usual 180-degree rotational symmetry.
+    """
+    rng = random.Random(seed)
+    grid = [["_"] * width for _ in range(height)]
+    for i in range(height):
+        for j in range(width):
+            if (i, j) <= (height - 1 - i, width - 1 - j) and rng.random() < density:
+                grid[i][j] = "#"
+                grid[height - 1 - i][width - 1 - j] = "#"
+    return "\n".join("".join(row) for row in grid) + "\n"
+
+
+def format_value(value):
+    """Format a statistic for the report table."""
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,21 @@
+import hashlib
+import json
+import os
+
+
+# Bump when the layout of the cached word index changes
+INDEX_VERSION = 1
+
+
 class Variable():
 
     ACROSS = "across"
     DOWN = "down"
 
+    # variables are dictionary keys throughout the search, so keep them small
+    # and compute the hash once
+    __slots__ = ("i", "j", "direction", "length", "cells", "_hash")
+
     def __init__(self, i, j, direction, length):
         """Create a new variable with starting point, direction, and length."""
         self.i = i
@@ -15,11 +28,14 @@ class Variable():
                 (self.i + (k if self.direction == Variable.DOWN else 0),
                  self.j + (k if self.direction == Variable.ACROSS else 0))
             )
+        self._hash = hash((self.i, self.j, self.direction, self.length))
 
     def __hash__(self):
-        return hash((self.i, self.j, self.direction, self.length))
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         return (
             (self.i == other.i) and
             (self.j == other.j) and
@@ -57,9 +73,14 @@ class Crossword():
                         row.append(False)
                 self.structure.append(row)
 
-        # Save vocabulary list
-        with open(words_file) as f:
-            self.words = set(f.read().upper().splitlines())
+        # Save vocabulary list, bucketed by length and indexed (see `index_words`);
+        # the domain bases are shared by every variable of a length, never copied
+        self.words_by_length, self.word_index, self.letter_index = load_words(words_file)
+        self.words = self.word_index.keys()
+        self.full_domains = {
+            length: (1 << len(words)) - 1
+            for length, words in self.words_by_length.items()
+        }
 
         # Determine variable set
         self.variables = set()
@@ -108,26 +129,150 @@ class Crossword():
         # For any pair of variables v1, v2, their overlap is either:
         #    None, if the two variables do not overlap; or
         #    (i, j), where v1's ith character overlaps v2's jth character
-        self.overlaps = dict()
-        for v1 in self.variables:
-            for v2 in self.variables:
-                if v1 == v2:
-                    continue
-                cells1 = v1.cells
-                cells2 = v2.cells
-                intersection = set(cells1).intersection(cells2)
-                if not intersection:
-                    self.overlaps[v1, v2] = None
-                else:
-                    intersection = intersection.pop()
-                    self.overlaps[v1, v2] = (
-                        cells1.index(intersection),
-                        cells2.index(intersection)
-                    )
+        # Only overlapping pairs are stored; looking up any other pair gives None.
+        # One pass over the grid finds, for each cell, the variables through it.
+        cell_variables = dict()
+        for var in self.variables:
+            for k, cell in enumerate(var.cells):
+                cell_variables.setdefault(cell, []).append((var, k))
+
+        self.overlaps = Overlaps()
+        self.adjacency = {var: [] for var in self.variables}
+        for crossing in cell_variables.values():
+            for v1, k1 in crossing:
+                for v2, k2 in crossing:
+                    if v1 != v2:
+                        self.overlaps[v1, v2] = (k1, k2)
+                        self.adjacency[v1].append((v2, (k1, k2)))
+
+        self.neighbor_sets = {
+            var: frozenset(v for v, _ in self.adjacency[var])
+            for var in self.variables
+        }
 
     def neighbors(self, var):
         """Given a variable, return set of overlapping variables."""
-        return set(
-            v for v in self.variables
-            if v != var and self.overlaps[v, var]
-        )
+        return self.neighbor_sets[var]
+
+
+class Overlaps(dict):
+    """Overlaps between pairs of variables, None for pairs that do not overlap."""
+
+    def __missing__(self, key):
+        return None
+
+
+def load_words(words_file):
+    """
+    Return the index of the words in `words_file` built by `index_words`.
+    The index is cached as JSON in the user's cache directory and reused
+    while the words file is unchanged, so repeated runs skip re-parsing.
+    """
+    path = os.path.abspath(words_file)
+    stat = os.stat(path)
+    key = [INDEX_VERSION, path, stat.st_size, stat.st_mtime_ns]
+    cache_file = os.path.join(
+        cache_directory(),
+        hashlib.sha256(path.encode()).hexdigest()[:16] + ".json"
+    )
+
+    # JSON can only describe data, so a tampered cache cannot run code;
+    # anything unexpected in it just means building the index again
+    try:
+        with open(cache_file) as f:
+            cached = json.load(f)
+        if cached["key"] == key:
+            words_by_length = {
+                int(length): words
+                for length, words in cached["words"].items()
+            }
+            letter_index = {
+                int(length): [
+                    {letter: int(bits, 16) for letter, bits in position.items()}
+                    for position in positions
+                ]
+                for length, positions in cached["letters"].items()
+            }
+            word_index = {
+                word: k
+                for words in words_by_length.values()
+                for k, word in enumerate(words)
+            }
+            return words_by_length, word_index, letter_index
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        pass
+
+    with open(words_file) as f:
+        index = index_words(f.read().upper().splitlines())
+    words_by_length, word_index, letter_index = index
+
+    # Bitsets are stored in hexadecimal, which has no length limit when
+    # converted back to int; write to a temporary file first so a concurrent
+    # run never reads half a cache
+    try:
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        temporary = f"{cache_file}.{os.getpid()}"
+        with open(temporary, "w") as f:
+            json.dump({
+                "key": key,
+                "words": words_by_length,
+                "letters": {
+                    length: [
+                        {letter: format(bits, "x") for letter, bits in position.items()}
+                        for position in positions
+                    ]
+                    for length, positions in letter_index.items()
+                }
+            }, f)
+        os.replace(temporary, cache_file)
+    except OSError:
+        pass
+    return index
+
+
+def cache_directory():
+    """
+    Return the directory for cached word indexes: crossword/ under
+    $XDG_CACHE_HOME, or under ~/.cache if that is not set.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "crossword")
+
+
+def index_words(words):
+    """
+    Index a vocabulary for bitset domains, returning a tuple of:
+        words_by_length, mapping each length to the sorted list of words of
+            that length; a word's position in its list is its bit number,
+        word_index, mapping each word to its bit number, and
+        letter_index, where letter_index[length][position][letter] is the
+            bitset of words of that length with that letter at that position.
+    """
+    words_by_length = dict()
+    for word in sorted(set(words)):
+        if word:
+            words_by_length.setdefault(len(word), []).append(word)
+    word_index = {
+        word: k
+        for words in words_by_length.values()
+        for k, word in enumerate(words)
+    }
+
+    letter_index = dict()
+    for length, words in words_by_length.items():
+        positions = []
+        for position in range(length):
+            rows = dict()
+            for k, word in enumerate(words):
+                row = rows.get(word[position])
+                if row is None:
+                    row = rows[word[position]] = bytearray(len(words) // 8 + 1)
+                row[k >> 3] |= 1 << (k & 7)
+            positions.append({
+                letter: int.from_bytes(row, "little")
+                for letter, row in rows.items()
+            })
+        letter_index[length] = positions
+    return words_by_length, word_index, letter_index
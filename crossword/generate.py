@@ -1,20 +1,125 @@
+import heapq
+import os
+import random
+import string
 import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from multiprocessing import Pool
 
 from crossword import *
 
 
+class SearchLimit(Exception):
+    """Raised when a backtracking search uses up its node budget."""
+
+
 class CrosswordCreator():
 
-    def __init__(self, crossword):
+    def __init__(self, crossword, inference="mac", lcv_limit=None,
+                 heuristic="mrv", seed=None, restarts=None,
+                 engine="backtrack", nogood_limit=10000):
         """
         Create new CSP crossword generate.
+
+        `inference` is the pruning done after each assignment during search:
+        None, "forward" (forward checking) or "mac" (maintaining arc consistency).
+        `lcv_limit`, if given, caps how many values `order_domain_values`
+        ranks by least-constraining value.
+        `heuristic` picks the next variable: "mrv" (fewest values, then
+        highest degree) or "domwdeg" (fewest values per unit of constraint
+        weight, where a constraint gains weight each time it empties a domain).
+        `seed`, if given, breaks ties between variables and values at random.
+        `restarts`, if given, is the node budget of the first search; each
+        time the budget runs out the search restarts with a larger one.
+        `engine` is the search run by `solve`: "backtrack" (chronological
+        backtracking with `inference`) or "backjump" (conflict-directed
+        backjumping with forward checking, remembering up to `nogood_limit`
+        failed partial assignments).
         """
         self.crossword = crossword
+        self.inference = inference
+        self.lcv_limit = lcv_limit
+        self.heuristic = heuristic
+        self.random = random.Random(seed) if seed is not None else None
+        self.restarts = restarts
+        self.weights = dict()
+        self.node_limit = None
+
+        # search statistics, reported by `statistics`
+        self.nodes = 0
+        self.backtracks = 0
+        self.revisions = 0
+        self.pruned = 0
+        self.ac3_time = 0
+        self.search_time = 0
+        self.engine = engine
+
+        # nogoods: partial assignments, as frozensets of (variable, word)
+        # pairs, known to have no solution; least recently used first
+        self.nogood_limit = nogood_limit
+        self.nogoods = OrderedDict()
+        self.nogood_index = dict()
+
+        # every domain reduction made during search is pushed here as
+        # (variable, removed words), and popped again to undo it
+        self.trail = []
+        self.variables_by_length = dict()
+        for var in self.crossword.variables:
+            self.variables_by_length.setdefault(var.length, []).append(var)
+
+        # The vocabulary index is built by the crossword: the words of each
+        # length are numbered, and a domain is an int bitset with bit k set if
+        # the kth word is a candidate; ints are immutable, so every variable
+        # of a length starts from the same shared base
+        self.words_by_length = self.crossword.words_by_length
+        self.word_index = self.crossword.word_index
+        self.letter_index = self.crossword.letter_index
         self.domains = {
-            var: self.crossword.words.copy()
+            var: self.crossword.full_domains.get(var.length, 0)
             for var in self.crossword.variables
         }
 
+    def letters(self, length, position):
+        """
+        Return a dictionary mapping each letter to the bitset of words of
+        `length` that have that letter at `position`.
+        """
+        positions = self.letter_index.get(length)
+        return positions[position] if positions else dict()
+
+    def domain_words(self, var, bits=None):
+        """
+        Return the list of words in the domain of `var`,
+        or in the bitset `bits` over words of `var`'s length if given.
+        """
+        if bits is None:
+            bits = self.domains[var]
+        words = self.words_by_length.get(var.length, [])
+        # scanning the binary string is linear, unlike repeatedly clearing the lowest bit
+        binary = bin(bits)[:1:-1]
+        result = []
+        k = binary.find("1")
+        while k != -1:
+            result.append(words[k])
+            k = binary.find("1", k + 1)
+        return result
+
+    def domain_size(self, var):
+        """
+        Return the number of words in the domain of `var`.
+        """
+        return self.domains[var].bit_count()
+
+    def in_domain(self, var, word):
+        """
+        Return True if `word` is in the domain of `var`.
+        """
+        if len(word) != var.length:
+            return False
+        return bool(self.domains[var] >> self.word_index[word] & 1)
+
     def letter_grid(self, assignment):
         """
         Return 2D array representing a given assignment.
@@ -46,44 +151,50 @@ class CrosswordCreator():
 
     def save(self, assignment, filename):
         """
-        Save crossword assignment to an image file. pip3 install pillow is necessary.
+        Save crossword assignment to an image file. pip3 install pillow numpy is necessary.
+        """
+        self.save_many([assignment], [filename])
+
+    def save_many(self, assignments, filenames):
         """
-        from PIL import Image, ImageDraw, ImageFont
+        Save each crossword assignment in `assignments` to the image file of
+        the same position in `filenames`. pip3 install pillow numpy is necessary.
+
+        The empty grid is drawn once and every letter is rasterized once
+        (see `glyph_tiles`); each image is then a copy of the grid with
+        letter tiles pasted into its cells.
+        """
+        from PIL import Image
+        import numpy as np
         cell_size = 100
         cell_border = 2
-        interior_size = cell_size - 2 * cell_border
-        letters = self.letter_grid(assignment)
+        tiles = glyph_tiles(FONT_FILE, 80, cell_size, cell_border)
 
-        # Create a blank canvas
-        img = Image.new(
-            "RGBA",
-            (self.crossword.width * cell_size,
-             self.crossword.height * cell_size),
-            "black"
+        # Create a blank canvas: black, with a white square for each open cell
+        grid = np.zeros(
+            (self.crossword.height * cell_size, self.crossword.width * cell_size, 4),
+            dtype=np.uint8
         )
-        font = ImageFont.truetype("assets/fonts/OpenSans-Regular.ttf", 80)
-        draw = ImageDraw.Draw(img)
-
+        grid[:, :, 3] = 255
+        cells = []
         for i in range(self.crossword.height):
             for j in range(self.crossword.width):
-
-                rect = [
-                    (j * cell_size + cell_border,
-                     i * cell_size + cell_border),
-                    ((j + 1) * cell_size - cell_border,
-                     (i + 1) * cell_size - cell_border)
-                ]
                 if self.crossword.structure[i][j]:
-                    draw.rectangle(rect, fill="white")
-                    if letters[i][j]:
-                        w, h = draw.textsize(letters[i][j], font=font)
-                        draw.text(
-                            (rect[0][0] + ((interior_size - w) / 2),
-                             rect[0][1] + ((interior_size - h) / 2) - 10),
-                            letters[i][j], fill="black", font=font
-                        )
-
-        img.save(filename)
+                    # same corners as the inclusive rectangle PIL would draw
+                    top = i * cell_size + cell_border
+                    left = j * cell_size + cell_border
+                    bottom = (i + 1) * cell_size - cell_border + 1
+                    right = (j + 1) * cell_size - cell_border + 1
+                    grid[top:bottom, left:right, :3] = 255
+                    cells.append((i, j, top, left, bottom, right))
+
+        for assignment, filename in zip(assignments, filenames):
+            letters = self.letter_grid(assignment)
+            canvas = grid.copy()
+            for i, j, top, left, bottom, right in cells:
+                if letters[i][j]:
+                    canvas[top:bottom, left:right] = tiles[letters[i][j], i == 0]
+            Image.fromarray(canvas, "RGBA").save(filename)
 
     def solve(self):
         """
@@ -93,8 +204,97 @@ class CrosswordCreator():
         call backtrack on inially empty assignment to try to calculate solution
         """
         self.enforce_node_consistency()
-        self.ac3()
-        return self.backtrack(dict())
+        consistent, _ = self.ac3()
+        if not consistent:
+            return None
+        start = time.perf_counter()
+        try:
+            return self.search()
+        finally:
+            self.search_time += time.perf_counter() - start
+
+    def search(self):
+        """
+        Run the search engine chosen for this creator from an empty assignment,
+        returning a complete assignment or None.
+        """
+        if self.engine == "backjump":
+            self.causes = []
+            assignment, _ = self.backjump(dict(), dict())
+            return assignment
+        if self.restarts is None:
+            return self.backtrack(dict())
+
+        # randomized restarts: constraint weights and the random ties carry
+        # over, so each new attempt explores a different part of the tree
+        budget = self.restarts
+        mark = len(self.trail)
+        while True:
+            self.node_limit = self.nodes + budget
+            try:
+                return self.backtrack(dict())
+            except SearchLimit:
+                self.undo(mark)
+                budget = budget * 3 // 2 + 1
+
+    def statistics(self):
+        """
+        Return a dictionary of counters describing the work done so far:
+        search nodes expanded, assignments undone (backtracks), calls to
+        `revise`, words pruned from domains, and seconds spent in `ac3`
+        and in search (which includes the `ac3` calls made by MAC).
+        """
+        return {
+            "nodes": self.nodes,
+            "backtracks": self.backtracks,
+            "revisions": self.revisions,
+            "pruned": self.pruned,
+            "ac3 seconds": self.ac3_time,
+            "search seconds": self.search_time
+        }
+
+    def solutions(self, limit=None):
+        """
+        Generate up to `limit` distinct complete assignments (all of them if
+        `limit` is None), one at a time as the search finds them.
+        Each assignment yielded is a new dictionary.
+        """
+        self.enforce_node_consistency()
+        consistent, _ = self.ac3()
+        if not consistent:
+            return
+        if limit is not None and limit <= 0:
+            return
+        found = 0
+        for assignment in self.backtrack_all(dict(), set()):
+            yield assignment
+            found += 1
+            if limit is not None and found >= limit:
+                return
+
+    def backtrack_all(self, assignment, used):
+        """
+        Generate every complete assignment extending `assignment`, whose
+        words are `used`, searching as `backtrack` does but carrying on past
+        each solution instead of stopping at the first.
+        """
+        if len(assignment) == len(self.crossword.variables):
+            yield dict(assignment)
+            return
+
+        self.nodes += 1
+        var = self.select_unassigned_variable(assignment)
+        for value in self.order_domain_values(var, assignment):
+            if self.consistent_with(var, value, assignment, used):
+                assignment[var] = value
+                used.add(value)
+                mark = len(self.trail)
+                if self.inference is None or self.infer(var, value, assignment):
+                    yield from self.backtrack_all(assignment, used)
+                self.undo(mark)
+                self.backtracks += 1
+                del assignment[var]
+                used.discard(value)
 
     def enforce_node_consistency(self):
         """
@@ -102,14 +302,10 @@ class CrosswordCreator():
         (Remove any values that are inconsistent with a variable's unary
          constraints; in this case, the length of the word.)
         """
-        # To remove a value x from the domain of a variable v, 
-        # since self.domains is a dictionary mapping variables to sets of values, 
-        # can call self.domains[v].remove(x)
-        # no return value necessary
+        # domains only ever hold words of the variable's own length, since each
+        # length has its own bit numbering; keep just the bits that name a word
         for var in self.domains:
-            for word in set(self.domains[var]):
-                if len(word) != var.length:
-                    self.domains[var].remove(word)
+            self.domains[var] &= self.crossword.full_domains.get(var.length, 0)
 
 
     def revise(self, x, y):
@@ -122,24 +318,36 @@ class CrosswordCreator():
         False if no revision was made.
         """
         # self.crossword.overlaps calls any overlap between variables x and y 
-        # follow pseudocode idea from lecture notes
-        revised = False
-        i, j = self.crossword.overlaps[x, y]
-
-        for word_x in set(self.domains[x]):
-            delete = True
-            
-            for word_y in self.domains[y]:
-                # if i, j are the same value and the words are not the same
-                if word_x[i] == word_y[j] and word_x != word_y:
-                    delete = False
-            # self.domains[x].remove(word_x) to remove values
-            # a value was removed, return true
-            if delete:
-                self.domains[x].remove(word_x)
-                revised = True
-        
-        return revised
+        # instead of comparing every pair of words, ask for each letter at x's
+        # overlap position whether any word of y has that letter at its position
+        self.revisions += 1
+        overlap = self.crossword.overlaps[x, y]
+        if overlap is None:
+            return False
+        i, j = overlap
+        domain_x = self.domains[x]
+        domain_y = self.domains[y]
+        y_letters = self.letters(y.length, j)
+
+        revised = domain_x
+        for letter, words in self.letters(x.length, i).items():
+            candidates = domain_x & words
+            if not candidates:
+                continue
+            support = domain_y & y_letters.get(letter, 0)
+            if not support:
+                # no word of y fits, remove every word with this letter
+                revised &= ~words
+            elif x.length == y.length and not support & (support - 1):
+                # a single supporting word cannot also be used by x itself,
+                # if x would otherwise take it for this letter
+                revised &= ~(support & words)
+
+        if revised == domain_x:
+            return False
+        self.pruned += (domain_x & ~revised).bit_count()
+        self.domains[x] = revised
+        return True
 
 
     def ac3(self, arcs=None):
@@ -148,30 +356,59 @@ class CrosswordCreator():
         If `arcs` is None, begin with initial list of all arcs in the problem.
         Otherwise, use `arcs` as the initial list of arcs to make consistent.
 
-        Return True if arc consistency is enforced and no domains are empty;
-        return False if one or more domains end up empty.
-        """
-        # example pseudocode in notes
-        # satisfy variables binary constraints
-        if arcs is None:
-            arcs = []
-            for x in self.domains:
-                for y in self.crossword.neighbors(x):
-                    arcs.append((x, y))
-                
-                for x, y in arcs:
-                    if self.revise(x, y):
+        Return a pair `(consistent, removed)`. `consistent` is True if arc
+        consistency is enforced and no domains are empty, False if one or
+        more domains end up empty. `removed` maps each revised variable to
+        the bitset of words taken out of its domain, so that
+        `self.restore(removed)` undoes the call.
+        """
+        start = time.perf_counter()
+        try:
+            # example pseudocode in notes
+            # satisfy variables binary constraints
+            if arcs is None:
+                arcs = [
+                    (x, y)
+                    for x in self.domains
+                    for y in self.crossword.neighbors(x)
+                ]
+
+            # worklist of arcs; `queued` keeps each arc in the queue at most once
+            queue = deque()
+            queued = set()
+            for arc in arcs:
+                if arc not in queued:
+                    queued.add(arc)
+                    queue.append(arc)
+
+            removed = dict()
+            while queue:
+                x, y = queue.popleft()
+                queued.discard((x, y))
+                before = self.domains[x]
+                if self.revise(x, y):
+                    removed[x] = removed.get(x, 0) | (before & ~self.domains[x])
                     # nothing in the domain, no possible values = no solution
-                        if len(self.domains[x]) == 0:
-                            return False
-                # to implement AC3, revise each arc in the queue one at a time. 
-                # Any time you make a change to a domain, 
-                # need to add additional arcs to your queue to 
-                # ensure that other arcs stay consistent
-                    # add arcs w to the queue
-                for w in self.crossword.neighbors(x) - self.domains[y]:
-                    arcs.append((w, x))
-        return True
+                    if not self.domains[x]:
+                        self.weigh(x, y)
+                        return False, removed
+                    # only arcs pointing at x can have lost support; (y, x) cannot,
+                    # since every word left in x still has a partner in y
+                    for z in self.crossword.neighbors(x):
+                        if z != y and (z, x) not in queued:
+                            queued.add((z, x))
+                            queue.append((z, x))
+            return True, removed
+        finally:
+            self.ac3_time += time.perf_counter() - start
+
+    def restore(self, removed):
+        """
+        Put back the words recorded in `removed`, a mapping from variables
+        to bitsets of removed words such as the one returned by `ac3`.
+        """
+        for var, words in removed.items():
+            self.domains[var] |= words
 
 
     def assignment_complete(self, assignment):
@@ -214,12 +451,24 @@ class CrosswordCreator():
                     # not the same letter in that same position for word y,
                     # overlap constraint is not consistent
                     if assignment[x][i] != assignment[y][j]:
-                        # if the two variables map to the same word, not consistent
-                        if assignment[x] == assignment[y]:
-                            return False
+                        return False
         # if all constraints met
         return True
 
+    def consistent_with(self, var, value, assignment, used):
+        """
+        Return True if assigning `value` to `var` keeps `assignment`
+        consistent, given that `assignment` is already consistent and `used`
+        is the set of words it uses. Only the constraints on `var` are checked.
+        """
+        if value in used or len(value) != var.length:
+            return False
+        for neighbor, (i, j) in self.crossword.adjacency[var]:
+            word = assignment.get(neighbor)
+            if word is not None and value[i] != word[j]:
+                return False
+        return True
+
 
     def order_domain_values(self, var, assignment):
         """
@@ -234,27 +483,49 @@ class CrosswordCreator():
             # eliminating n possible choices for neighboring variables, 
             # order results in ascending order of n
 
+        # for each unassigned neighbor, count once how many of its live words
+        # have each letter where it crosses var; a value then keeps only the
+        # words with its own letter there, and rules out all the others
+        crossings = []
+        for neighbor_var, (i, j) in self.crossword.adjacency[var]:
+            # any variable present in assignment already has a value, 
+            # therefore shouldn’t be counted
+            if neighbor_var not in assignment:
+                domain = self.domains[neighbor_var]
+                counts = {
+                    letter: (domain & words).bit_count()
+                    for letter, words in self.letters(neighbor_var.length, j).items()
+                }
+                crossings.append((neighbor_var, i, j, domain.bit_count(), counts))
+
         # n must be a dictionary {dict()} not a list { [] } in order to use .get
         n = dict()
-        for value in self.domains[var]:
-            # inital condition
+        for value in self.domain_words(var):
             # compute number of values [n] ruled out for neighboring unassigned vars
             n[value] = 0
-            # any variable present in assignment already has a value, 
-            # therefore shouldn’t be counted
-            for neighbor_var in self.crossword.neighbors(var):
-                if neighbor_var not in assignment:
-                    if value in self.domains[neighbor_var]:
-                        # add and equate value to dictionary of eliminating n possible choices
-                        n[value] += 1
-        # sort a list according to a particular key: Python contains these functions
-        # list.sort() method that modifies the list in-place, only defined for lists
+            for neighbor_var, i, j, size, counts in crossings:
+                n[value] += size - counts.get(value[i], 0)
+                # the neighbor also cannot reuse value itself, if not already
+                # counted; compare lengths and letters first, as the domain
+                # test is slower
+                if (neighbor_var.length == var.length and value[j] == value[i]
+                        and self.in_domain(neighbor_var, value)):
+                    n[value] += 1
+
+        # for huge domains, only find the best `lcv_limit` values; the rest
+        # follow in dictionary order so that no value is skipped
+        key = n.get
+        if self.random:
+            ties = {value: self.random.random() for value in n}
+            key = lambda value: (n[value], ties[value])
+        if self.lcv_limit is not None and len(n) > self.lcv_limit:
+            best = heapq.nsmallest(self.lcv_limit, n, key=key)
+            chosen = set(best)
+            return best + [value for value in n if value not in chosen]
+
         # sorted() builds a new sorted list from an iterable, accepts any iterable
-            # sorted(iterable, *, key=None, reverse=False) 
-            # -- key should extract a comparison key from each n=iterable
-                # key=lambda n: (n[1]) {(n[1])--first n in ascending order}
             # -- key= n.get -- .get returns the value of the item with the specified key
-        return sorted(n, key=n.get)
+        return sorted(n, key=key)
 
 
     def select_unassigned_variable(self, assignment):
@@ -270,26 +541,132 @@ class CrosswordCreator():
         variables = []
         for var in self.crossword.variables:
             if var not in assignment:
-                variables.append([var, len(self.domains[var]), len(self.crossword.neighbors(var))])
+                tie = self.random.random() if self.random else 0
+                if self.heuristic == "domwdeg":
+                    # dom/wdeg: weighted degree counts only constraints with unassigned variables
+                    weight = sum(
+                        self.weights.get((var, neighbor), 1)
+                        for neighbor in self.crossword.neighbors(var)
+                        if neighbor not in assignment
+                    )
+                    variables.append([var, self.domain_size(var) / max(weight, 1), 0, tie])
+                else:
+                    variables.append([var, self.domain_size(var), len(self.crossword.neighbors(var)), tie])
 
         if variables:
-            # x[1]-- [1]:ascending order n; -x[2]-- (-):descending order degree
-            variables.sort(key=lambda x: (x[1], -x[2]))
+            # x[1]-- [1]:ascending order n; -x[2]-- (-):descending order degree; x[3]-- random tie-break
+            variables.sort(key=lambda x: (x[1], -x[2], x[3]))
             # [0][0] -- multiplying string of length [#] by string of length [#]
             return variables[0][0]
         return None
 
 
-    def backtrack(self, assignment):
+    def infer(self, var, value, assignment):
+        """
+        Prune the domains of unassigned variables now that `var` is assigned
+        `value` (already added to `assignment`), recording every reduction on
+        `self.trail`: forward checking, followed with MAC by restoring arc
+        consistency from every variable forward checking changed.
+
+        Return False if a domain becomes empty, True otherwise.
+        """
+        changed = self.forward_check(var, value, assignment)
+        if changed is None:
+            return False
+
+        if self.inference == "mac":
+            arcs = [
+                (z, x)
+                for x in changed
+                for z in self.crossword.neighbors(x)
+                if z not in assignment
+            ]
+            consistent, removed = self.ac3(arcs)
+            self.trail.extend(removed.items())
+            return consistent
+        return True
+
+    def forward_check(self, var, value, assignment):
+        """
+        Prune the domains of unassigned variables now that `var` is assigned
+        `value`, recording every reduction on `self.trail`. Variables of the
+        same length lose `value`, and neighbors keep only words with the
+        letter of `value` where they cross it.
+
+        Return the list of variables whose domains changed, or None if a
+        domain becomes empty, in which case `self.wipeout` is that variable.
+        """
+        bit = 1 << self.word_index[value]
+        self.prune(var, self.domains[var] & bit)
+        changed = [var]
+
+        for other in self.variables_by_length[var.length]:
+            if other not in assignment and self.domains[other] & bit:
+                self.prune(other, self.domains[other] & ~bit)
+                if not self.domains[other]:
+                    self.wipeout = other
+                    return None
+                changed.append(other)
+
+        for neighbor, (i, j) in self.crossword.adjacency[var]:
+            if neighbor not in assignment:
+                letter = self.letters(neighbor.length, j).get(value[i], 0)
+                self.prune(neighbor, self.domains[neighbor] & letter)
+                if not self.domains[neighbor]:
+                    self.weigh(var, neighbor)
+                    self.wipeout = neighbor
+                    return None
+                changed.append(neighbor)
+        return changed
+
+    def weigh(self, x, y):
+        """
+        Increase the weight of the constraint between `x` and `y`,
+        which has just emptied a domain.
+        """
+        self.weights[x, y] = self.weights.get((x, y), 1) + 1
+        self.weights[y, x] = self.weights[x, y]
+
+    def prune(self, var, domain):
+        """
+        Replace the domain of `var` with `domain`, a subset of it,
+        recording the removed words on `self.trail`.
+        """
+        removed = self.domains[var] & ~domain
+        if removed:
+            self.pruned += removed.bit_count()
+            self.trail.append((var, removed))
+            self.domains[var] = domain
+
+    def undo(self, mark):
+        """
+        Undo every domain reduction recorded on `self.trail` since it had
+        length `mark`.
+        """
+        while len(self.trail) > mark:
+            var, removed = self.trail.pop()
+            self.domains[var] |= removed
+
+    def backtrack(self, assignment, used=None):
         """
         Using Backtracking Search, take as input a partial assignment for the
         crossword and return a complete assignment if possible to do so.
 
         `assignment` is a mapping from variables (keys) to words (values).
+        `used` is the set of words in `assignment`; it is computed when
+        not given, and kept up to date as variables are assigned and unassigned.
 
         If no assignment is possible, return None.
         """
-        if self.assignment_complete(assignment):
+        if used is None:
+            used = set(assignment.values())
+
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchLimit()
+
+        # only consistent words are ever assigned, so counting assigned variables is enough
+        if len(assignment) == len(self.crossword.variables):
             return assignment
         
         # algorithm is more efficient if 
@@ -297,32 +674,277 @@ class CrosswordCreator():
             # as by maintaining arc consistency every time you make a new assignment
         var = self.select_unassigned_variable(assignment)
         for value in self.order_domain_values(var, assignment):
-            assignment[var] = value
-            if self.consistent(assignment):
-                result = self.backtrack(assignment)
-                if result is None:
-                    assignment[var] = None
-                else:
-                    return result
+            # the rest of the assignment was checked when it was made, so only check var
+            if self.consistent_with(var, value, assignment, used):
+                assignment[var] = value
+                used.add(value)
+                mark = len(self.trail)
+                if self.inference is None or self.infer(var, value, assignment):
+                    result = self.backtrack(assignment, used)
+                    if result is not None:
+                        return result
+                self.undo(mark)
+                self.backtracks += 1
+                del assignment[var]
+                used.discard(value)
         # no satisfying assignment is possible, function should return None
         return None
 
+    def backjump(self, assignment, owners):
+        """
+        Using conflict-directed backjumping with forward checking, take as
+        input a partial assignment for the crossword and return a complete
+        assignment if possible to do so. `owners` maps each word in
+        `assignment` back to its variable.
+
+        Return a pair `(assignment, None)` on success. On failure return
+        `(None, conflict)`, where `conflict` is a set of assigned variables
+        whose values together leave no solution; search backs up straight to
+        the most recent of them, skipping variables that played no part.
+        """
+        if len(assignment) == len(self.crossword.variables):
+            return assignment, None
+
+        self.nodes += 1
+        if self.node_limit is not None and self.nodes > self.node_limit:
+            raise SearchLimit()
+
+        var = self.select_unassigned_variable(assignment)
+        conflict = set()
+        for value in self.order_domain_values(var, assignment):
+            culprits = self.conflicts(var, value, assignment, owners)
+            if not culprits:
+                culprits = self.nogood_conflicts(var, value, assignment)
+            if culprits:
+                conflict |= culprits
+                continue
+
+            assignment[var] = value
+            owners[value] = var
+            mark = len(self.trail)
+            if self.forward_check(var, value, assignment) is not None:
+                # every reduction just made is explained by this assignment
+                self.causes.extend([var] * (len(self.trail) - mark))
+                result, below = self.backjump(assignment, owners)
+                if result is not None:
+                    return result, None
+            else:
+                below = self.pruners(self.wipeout) | {var}
+            self.undo(mark)
+            self.backtracks += 1
+            del self.causes[mark:]
+            del assignment[var]
+            del owners[value]
+
+            # var played no part in the failure below, so no other value
+            # for it can help either: jump back past it
+            if var not in below:
+                return None, below
+            conflict |= below - {var}
+
+        # values missing from var's domain were removed by earlier assignments
+        conflict |= self.pruners(var)
+        self.learn(frozenset((v, assignment[v]) for v in conflict))
+        return None, conflict
+
+    def pruners(self, var):
+        """
+        Return the set of assigned variables whose forward checking removed
+        words from the domain of `var` during backjumping.
+        """
+        return {
+            cause
+            for (pruned, _), cause in zip(self.trail, self.causes)
+            if pruned == var
+        }
+
+    def conflicts(self, var, value, assignment, owners):
+        """
+        Return the set of assigned variables that conflict with assigning
+        `value` to `var`: neighbors with a different letter where they cross,
+        and the variable already using `value`.
+        """
+        culprits = set()
+        owner = owners.get(value)
+        if owner is not None:
+            culprits.add(owner)
+        for neighbor, (i, j) in self.crossword.adjacency[var]:
+            word = assignment.get(neighbor)
+            if word is not None and value[i] != word[j]:
+                culprits.add(neighbor)
+        return culprits
+
+    def nogood_conflicts(self, var, value, assignment):
+        """
+        Return the other variables of a recorded nogood that assigning
+        `value` to `var` would complete, or an empty set if there is none.
+        """
+        for nogood in self.nogood_index.get((var, value), ()):
+            if all(v == var or assignment.get(v) == word for v, word in nogood):
+                self.nogoods.move_to_end(nogood)
+                return {v for v, _ in nogood if v != var}
+        return set()
+
+    def learn(self, nogood):
+        """
+        Record `nogood`, evicting the least recently used nogood
+        once more than `self.nogood_limit` are stored.
+        """
+        if not nogood or nogood in self.nogoods:
+            return
+        self.nogoods[nogood] = None
+        for pair in nogood:
+            self.nogood_index.setdefault(pair, set()).add(nogood)
+        if len(self.nogoods) > self.nogood_limit:
+            evicted, _ = self.nogoods.popitem(last=False)
+            for pair in evicted:
+                self.nogood_index[pair].discard(evicted)
+                if not self.nogood_index[pair]:
+                    del self.nogood_index[pair]
+
+
+# Font used to draw letters in saved images
+FONT_FILE = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "assets", "fonts", "OpenSans-Regular.ttf"
+)
+
+# Rasterized letters, keyed by (font file, font size, cell size, cell border);
+# batch.py saves images from several threads, so the cache is filled under a lock
+GLYPHS = dict()
+GLYPHS_LOCK = threading.Lock()
+
+
+def glyph_tiles(font_file, font_size, cell_size, cell_border):
+    """
+    Return a dictionary-like object mapping (letter, top) to a NumPy RGBA
+    array of a white cell interior with the letter drawn in black, placed
+    as in a cell of a saved crossword, in the top row if `top`. The font is
+    loaded and A to Z are drawn once, then reused; any other letter is
+    drawn when first needed.
+    """
+    key = (font_file, font_size, cell_size, cell_border)
+    with GLYPHS_LOCK:
+        if key not in GLYPHS:
+            GLYPHS[key] = GlyphTiles(font_file, font_size, cell_size, cell_border)
+        return GLYPHS[key]
+
+
+class GlyphTiles(dict):
+    """Letter tiles for `glyph_tiles`, with A to Z rendered up front."""
+
+    def __init__(self, font_file, font_size, cell_size, cell_border):
+        from PIL import ImageFont
+        super().__init__()
+        self.font = ImageFont.truetype(font_file, font_size)
+        self.cell_size = cell_size
+        self.cell_border = cell_border
+        for letter in string.ascii_uppercase:
+            for top in [True, False]:
+                self[letter, top] = self.render(letter, top)
+
+    def __missing__(self, key):
+        with GLYPHS_LOCK:
+            if key not in self:
+                self[key] = self.render(*key)
+            return dict.__getitem__(self, key)
+
+    def render(self, letter, top):
+        """Draw `letter` in a cell as `save` once did, and return its interior."""
+        from PIL import Image, ImageDraw
+        import numpy as np
+
+        # Pillow truncates fractional text positions toward zero, so a letter
+        # raised above the top edge of the image lands half a pixel away
+        # from one in a lower row; draw at the same side of zero as the image
+        interior_size = self.cell_size - 2 * self.cell_border
+        offset = 0 if top else self.cell_size
+        tile = Image.new("RGBA", (self.cell_size, offset + self.cell_size), "white")
+        draw = ImageDraw.Draw(tile)
+        # textsize was removed from newer Pillow; textbbox gives the same extent
+        if hasattr(draw, "textbbox"):
+            _, _, w, h = draw.textbbox((0, 0), letter, font=self.font)
+        else:
+            w, h = draw.textsize(letter, font=self.font)
+        draw.text(
+            (self.cell_border + (interior_size - w) / 2,
+             offset + self.cell_border + (interior_size - h) / 2 - 10),
+            letter, fill="black", font=self.font
+        )
+        inside = slice(self.cell_border, self.cell_size - self.cell_border + 1)
+        rows = slice(offset + self.cell_border, offset + self.cell_size - self.cell_border + 1)
+        return np.asarray(tile)[rows, inside]
+
+
+# Strategies raced by `portfolio`, as keyword arguments to CrosswordCreator;
+# each is run with several seeds
+STRATEGIES = [
+    {"heuristic": "mrv"},
+    {"heuristic": "domwdeg"},
+    {"heuristic": "mrv", "restarts": 100},
+    {"heuristic": "domwdeg", "restarts": 100},
+    {"heuristic": "domwdeg", "engine": "backjump"},
+]
+
+
+def portfolio(structure, words, workers=None, seeds=2):
+    """
+    Solve the crossword in `structure` with `words` by racing the
+    STRATEGIES, each with `seeds` different random seeds, in a pool of
+    `workers` processes. Return `(strategy, assignment, seconds)` for the
+    first search to finish; the other searches are cancelled.
+
+    A complete search that finds no solution proves there is none, so it
+    also ends the race, with `assignment` None.
+    """
+    jobs = [
+        (structure, words, dict(strategy, seed=seed))
+        for seed in range(seeds)
+        for strategy in STRATEGIES
+    ]
+    pool = Pool(workers or min(len(jobs), os.cpu_count() or 1))
+    try:
+        for result in pool.imap_unordered(run_strategy, jobs):
+            return result
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def run_strategy(job):
+    """
+    Solve one crossword with one strategy; the unit of work for `portfolio`.
+    """
+    structure, words, strategy = job
+    start = time.perf_counter()
+    creator = CrosswordCreator(Crossword(structure, words), **strategy)
+    assignment = creator.solve()
+    return strategy, assignment, time.perf_counter() - start
+
 
 def main():
 
     # Check usage
-    if len(sys.argv) not in [3, 4]:
-        sys.exit("Usage: python generate.py structure words [output]")
+    args = sys.argv[1:]
+    use_portfolio = "--portfolio" in args
+    if use_portfolio:
+        args.remove("--portfolio")
+    if len(args) not in [2, 3]:
+        sys.exit("Usage: python generate.py structure words [output] [--portfolio]")
 
     # Parse command-line arguments
-    structure = sys.argv[1]
-    words = sys.argv[2]
-    output = sys.argv[3] if len(sys.argv) == 4 else None
+    structure = args[0]
+    words = args[1]
+    output = args[2] if len(args) == 3 else None
 
     # Generate crossword
     crossword = Crossword(structure, words)
     creator = CrosswordCreator(crossword)
-    assignment = creator.solve()
+    if use_portfolio:
+        strategy, assignment, seconds = portfolio(structure, words)
+        settings = ", ".join(f"{key}={value}" for key, value in strategy.items())
+        print(f"Won by {settings} in {seconds:.3f}s")
+    else:
+        assignment = creator.solve()
 
     # Print result
     if assignment is None:
@@ -0,0 +1,118 @@
+import csv
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import heredity
+
+
+def main():
+
+    # Check for proper usage
+    if len(sys.argv) not in [2, 3, 4, 5]:
+        sys.exit("Usage: python batch.py (directory | families.jsonl | -) "
+                 "[workers] [exact|log|likelihood|gibbs] [samples]")
+    source = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    method = sys.argv[3] if len(sys.argv) > 3 else "exact"
+    samples = int(sys.argv[4]) if len(sys.argv) > 4 else 10000
+
+    # Each worker process lives for the whole batch, so interpreter startup
+    # and the inheritance table are paid for once per worker, not per family
+    start = time.perf_counter()
+    count = 0
+    jobs = ((kind, family, data, method, samples) for kind, family, data in read_families(source))
+    with Pool(workers, initializer=warm_up) as pool:
+        for record in pool.imap_unordered(infer, jobs, chunksize=4):
+            print(json.dumps(record), flush=True)
+            count += 1
+    elapsed = time.perf_counter() - start
+    print(f"{count} families in {elapsed:.2f}s "
+          f"({count / elapsed if elapsed else 0:.1f} families/s)", file=sys.stderr)
+
+
+def read_families(source):
+    """
+    Yield a (kind, family, data) triple for each family in `source`.
+
+    `source` is either a directory of CSV files, in which case `kind` is
+    "csv" and `data` is the path of each file, or a JSON-lines file ("-" for
+    standard input), one family per line as {"family": id, "people": [rows]},
+    in which case `kind` is "json", `family` is the line number and `data`
+    is the line itself, left for the worker to parse so that one bad line
+    fails only its own family.
+    """
+    if os.path.isdir(source):
+        for filename in sorted(os.listdir(source)):
+            if filename.endswith(".csv"):
+                yield "csv", filename, os.path.join(source, filename)
+        return
+
+    f = sys.stdin if source == "-" else open(source)
+    try:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            yield "json", number, line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def warm_up():
+    """
+    Build the cached inheritance table once when a worker process starts.
+    """
+    heredity.inheritance_table(heredity.PROBS["mutation"])
+
+
+def infer(job):
+    """
+    Run inference for one family and return its JSON-serializable result,
+    including how long loading and inference took.
+    """
+    kind, family, data, method, samples = job
+    start = time.perf_counter()
+    try:
+        if kind == "csv":
+            people = heredity.load_data(data)
+        else:
+            record = json.loads(data)
+            family = record.get("family", family)
+            people = heredity.people_from_rows(record["people"])
+
+        errors = None
+        if method == "exact":
+            probabilities = heredity.exact_inference(people)
+        elif method == "log":
+            probabilities = heredity.exact_inference(people, log_space=True)
+        elif method == "likelihood":
+            probabilities, errors = heredity.likelihood_weighting(people, samples)
+        elif method == "gibbs":
+            probabilities, errors = heredity.gibbs_sampling(people, samples)
+        else:
+            raise ValueError(f"unknown method: {method}")
+    except (OSError, KeyError, ValueError, TypeError, AttributeError,
+            ZeroDivisionError, csv.Error) as e:
+        return {
+            "family": family,
+            "error": f"{type(e).__name__}: {e}",
+            "seconds": time.perf_counter() - start
+        }
+
+    record = {
+        "family": family,
+        "method": method,
+        "people": len(people),
+        "seconds": time.perf_counter() - start,
+        "probabilities": probabilities
+    }
+    if errors is not None:
+        record["errors"] = errors
+    return record
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import csv
+import functools
 import itertools
+import math
+import operator
+import random
 import sys
 
 PROBS = {
@@ -40,26 +44,77 @@ PROBS = {
 def main():
 
     # Check for proper usage; main loads data from a file into a dictionary 'people'
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
+    if len(sys.argv) not in [2, 3, 4, 5]:
+        sys.exit("Usage: python heredity.py data.csv [exact|log|likelihood|gibbs] [samples] [seed]")
     people = load_data(sys.argv[1])
+    method = sys.argv[2] if len(sys.argv) > 2 else "exact"
+    samples = int(sys.argv[3]) if len(sys.argv) > 3 else 10000
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else None
+    if samples <= 0:
+        sys.exit("Number of samples must be positive")
+
+    # exact enumeration is the default; sampling trades accuracy for speed on large pedigrees
+    errors = None
+    if method == "exact":
+        probabilities = exact_inference(people)
+    elif method == "log":
+        probabilities = exact_inference(people, log_space=True)
+    elif method == "likelihood":
+        probabilities, errors = likelihood_weighting(people, samples, seed)
+    elif method == "gibbs":
+        probabilities, errors = gibbs_sampling(people, samples, seed)
+    else:
+        sys.exit(f"Unknown method: {method}")
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if errors is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    print(f"    {value}: {p:.4f} ± {errors[person][field][value]:.4f}")
+
+
+def new_probabilities(people, log_space=False):
+    """
+    Return a gene and trait distribution for each person in `people`,
+    with every probability initially set to 0 (-inf if `log_space`).
+    """
     # people maps each person’s name to another dictionary containing information about them
     # Keep track of gene and trait probabilities for each person, initially set to 0
-    probabilities = {
+    zero = -math.inf if log_space else 0
+    return {
         person: {
             "gene": {
-                2: 0,
-                1: 0,
-                0: 0
+                2: zero,
+                1: zero,
+                0: zero
             },
             "trait": {
-                True: 0,
-                False: 0
+                True: zero,
+                False: zero
             }
         }
         for person in people
     }
+
+
+def exact_inference(people, log_space=False):
+    """
+    Compute every person's gene and trait distribution exactly, by
+    enumerating all combinations of genes and traits consistent with
+    the evidence in `people`.
+
+    If `log_space` is True, joint probabilities are accumulated as
+    logarithms so that large families do not underflow to 0.
+    """
     # probabilities dictionary is created using a Python dictionary comprehension, which in this case creates one key/value pair for each person in our dictionary of people
+    probabilities = new_probabilities(people, log_space)
+
     # Loop over all sets of people who might have the trait
     names = set(people)
     for have_trait in powerset(names):
@@ -78,20 +133,15 @@ def main():
             for two_genes in powerset(names - one_gene):
 
                 # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+                if log_space:
+                    p = log_joint_probability(people, one_gene, two_genes, have_trait)
+                else:
+                    p = joint_probability(people, one_gene, two_genes, have_trait)
+                update(probabilities, one_gene, two_genes, have_trait, p, log_space)
 
     # Ensure probabilities sum to 1
-    normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    normalize(probabilities, log_space)
+    return probabilities
 
 
 def load_data(filename):
@@ -101,18 +151,27 @@ def load_data(filename):
     mother, father must both be blank, or both be valid names in the CSV.
     trait should be 0 or 1 if trait is known, blank otherwise.
     """
-    data = dict()
     with open(filename) as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            name = row["name"]
-            data[name] = {
-                "name": name,
-                "mother": row["mother"] or None,
-                "father": row["father"] or None,
-                "trait": (True if row["trait"] == "1" else
-                          False if row["trait"] == "0" else None)
-            }
+        return people_from_rows(csv.DictReader(f))
+
+
+def people_from_rows(rows):
+    """
+    Build the dictionary returned by `load_data` from an iterable of rows,
+    each a dictionary with fields name, mother, father and trait.
+    Besides the CSV strings, trait may also be a boolean, 0, 1 or None.
+    """
+    data = dict()
+    for row in rows:
+        name = row["name"]
+        trait = row.get("trait")
+        data[name] = {
+            "name": name,
+            "mother": row.get("mother") or None,
+            "father": row.get("father") or None,
+            "trait": (True if trait in ("1", True) else
+                      False if trait in ("0", False) else None)
+        }
     return data
 
 
@@ -139,181 +198,382 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    # people is a dictionary of people: keys represent names, values are dictionaries that contain mother and father keys
+    # Each person contributes the probability of their gene count given their
+    # parents' (from the shared inheritance table) and of their trait given it
     j_probability = 1
-    # create a zero_genes like the already made one_gene and two_genes
-    zero_genes = set()
-    # keys represent names, values are dictionaries containing mother & father keys
-    for i in people.keys():
-        if i not in one_gene and i not in two_genes:
-            # .add(i) puts i into the set
-            zero_genes.add(i)
-
-    # zero_genes
-    for i in zero_genes:
-        if people[i]["mother"] == None and people[i]["father"] == None:
-            # no parents listed, use PROBS["gene"]
-            probabil = PROBS["gene"][0]
-        # difference between elif and else
-        elif people[i]["father"] != None and people[i]["mother"] != None:
-            probabil = 1
-            # for ease, mother and father variables
-            mother = people[i]["mother"]
-            father = people[i]["father"]
-            # with parents, each parent will pass one of their two genes on to their child randomly, 
-            # PROBS["mutation"] chance that it mutates (from being the gene to not being the gene, vice versa)
-            # i.e. thinking -- if there is zero gene, 1-PROBS["mutation"]  
-            # *= multiplication
-            # consider all options: mother zero*father in zero,one,two; mother in one*father in zero,one,two; mother in two*father in zero,one,two
-            if mother in zero_genes and father in zero_genes:
-                probabil *= (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-            elif mother in zero_genes and father in one_gene:
-                # one_gene: 50% chance of passing the gene to kid
-                probabil *= (1 - PROBS["mutation"]) * 0.5
-            elif mother in zero_genes and father in two_genes:
-                # two_genes: parent will pass one of two genes to kid randomly, PROBS["mutation"] chance that it mutates
-                probabil *= (1 - PROBS["mutation"]) * (PROBS["mutation"])
-            
-            elif mother in one_gene and father in zero_genes:
-                probabil *= 0.5 * (1 - PROBS["mutation"])
-            elif mother in one_gene and father in one_gene:
-                probabil *= 0.5 * 0.5
-            elif mother in one_gene and father in two_genes:
-                probabil *= 0.5 * (PROBS["mutation"])
-
-            elif mother in two_genes and father in zero_genes:
-                probabil *= (PROBS["mutation"]) * (1 - PROBS["mutation"])
-            elif mother in two_genes and father in one_gene:
-                probabil *= (PROBS["mutation"]) * 0.5
-            elif mother in two_genes and father in two_genes:
-                probabil *= (PROBS["mutation"]) * (PROBS["mutation"])
-        # PROBS["trait"] to compute the probability that a person does or does not have a particular trait
-        # TRUE or FALSE
-        if i in have_trait:
-            probabil *= PROBS["trait"][0][True]
-        elif i not in have_trait:
-            probabil *= PROBS["trait"][0][False]
-        j_probability *= probabil
-
-    # one_gene -- kid WILL HAVE ONE GENE
-    for i in one_gene:
-        if people[i]["mother"] == None and people[i]["father"] == None:
-            probabil = PROBS["gene"][1]
-        elif people[i]["mother"] != None and people[i]["father"] != None:
-            probabil = 1
-            mother = people[i]["mother"]
-            father = people[i]["father"]
-        # probability of the KID HAVING 1 GENE if mother * father
-            if mother in zero_genes and father in zero_genes:
-                probabil *= (1 - PROBS["mutation"]) * PROBS["mutation"] + (1 - PROBS["mutation"]) * PROBS["mutation"]
-            elif mother in zero_genes and father in one_gene:
-                probabil *= (1 - PROBS["mutation"]) * 0.5 + PROBS["mutation"] * 0.5 
-            elif mother in zero_genes and father in two_genes:
-                probabil *= (PROBS["mutation"]) * (PROBS["mutation"]) + (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-        # consider all scenarios with mutation
-            elif mother in one_gene and father in zero_genes:
-                probabil *= 0.5 * (1 - PROBS["mutation"]) + 0.5 * PROBS["mutation"]
-            elif mother in one_gene and father in one_gene:
-                probabil *= 0.5 * 0.5 + 0.5 * 0.5
-        # this one is confusing
-            elif mother in one_gene and father in two_genes:
-                probabil *= 0.5 * (PROBS["mutation"]) + 0.5 * (1 - PROBS["mutation"])
-
-            elif mother in two_genes and father in zero_genes:
-                probabil *= (PROBS["mutation"]) * (PROBS["mutation"]) + (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-        # confusing
-            elif mother in two_genes and father in one_gene:
-                probabil *= (PROBS["mutation"]) * 0.5 + (1 - PROBS["mutation"]) * 0.5 
-            elif mother in two_genes and father in two_genes:
-                probabil *= (PROBS["mutation"]) * (1 - PROBS["mutation"]) + (PROBS["mutation"]) * (1 - PROBS["mutation"])
-
-        if i in have_trait:
-            probabil *= PROBS["trait"][1][True]
-        elif i not in have_trait:
-            probabil *= PROBS["trait"][1][False]
-        j_probability *= probabil
-    
-    # two_genes -- kid has both genes
-    for i in two_genes:
-        if people[i]["mother"] == None and people[i]["father"] == None:
-            probabil = PROBS["gene"][2]
-        elif people[i]["mother"] != None and people[i]["father"] != None:
-            probabil = 1
-            mother = people[i]["mother"]
-            father = people[i]["father"]
-
-            if mother in zero_genes and father in zero_genes:
-                probabil *= (PROBS["mutation"]) * (PROBS["mutation"])
-            elif mother in zero_genes and father in one_gene:
-                # one_gene: 50% chance of passing the gene to kid
-                probabil *= (PROBS["mutation"]) * 0.5
-            elif mother in zero_genes and father in two_genes:
-                # two_genes: parent will pass one of two genes to kid randomly, PROBS["mutation"] chance that it mutates
-                probabil *= (PROBS["mutation"]) * (1 - PROBS["mutation"])
-            
-            elif mother in one_gene and father in zero_genes:
-                probabil *= 0.5 * (PROBS["mutation"])
-            elif mother in one_gene and father in one_gene:
-                probabil *= 0.5 * 0.5
-            elif mother in one_gene and father in two_genes:
-                probabil *= 0.5 * (1 - PROBS["mutation"])
-
-            elif mother in two_genes and father in zero_genes:
-                probabil *= (1 - PROBS["mutation"]) * (PROBS["mutation"])
-            elif mother in two_genes and father in one_gene:
-                probabil *= (1 - PROBS["mutation"]) * 0.5
-            elif mother in two_genes and father in two_genes:
-                probabil *= (1 - PROBS["mutation"]) * (1 - PROBS["mutation"])
-
-        if i in have_trait:
-            probabil *= PROBS["trait"][2][True]
-        elif i not in have_trait:
-            probabil *= PROBS["trait"][2][False]
-        j_probability *= probabil
-
+    for factor in joint_factors(people, one_gene, two_genes, have_trait):
+        j_probability *= factor
     return j_probability
-        
 
-def update(probabilities, one_gene, two_genes, have_trait, p):
+
+def update(probabilities, one_gene, two_genes, have_trait, p, log_space=False):
     """
     Add to `probabilities` a new joint probability `p`.
     Each person should have their "gene" and "trait" distributions updated.
     Which value for each distribution is updated depends on whether
     the person is in `have_gene` and `have_trait`, respectively.
+
+    If `log_space` is True, `p` and the entries of `probabilities` are
+    natural logarithms, and the addition is done with log-sum-exp.
     """
     # update probabilities[person]["gene"] and probabilities[person]["trait"] by adding p to the appropriate value
     # function should not return any value
+    add = log_add if log_space else operator.add
     for person in probabilities:
         if person not in two_genes and person not in one_gene:
-            probabilities[person]["gene"][0] += p
+            genes = 0
         elif person in one_gene:
-            probabilities[person]["gene"][1] += p
+            genes = 1
         else:
-            probabilities[person]["gene"][2] += p
-        
-        if person in have_trait:
-            probabilities[person]["trait"][True] += p
-        elif person not in have_trait:
-            probabilities[person]["trait"][False] += p
+            genes = 2
+        gene = probabilities[person]["gene"]
+        gene[genes] = add(gene[genes], p)
+
+        trait = probabilities[person]["trait"]
+        has_trait = person in have_trait
+        trait[has_trait] = add(trait[has_trait], p)
 
 
-def normalize(probabilities):
+def normalize(probabilities, log_space=False):
     """
     Update `probabilities` such that each probability distribution
     is normalized (i.e., sums to 1, with relative proportions the same).
+
+    If `log_space` is True, the entries of `probabilities` are natural
+    logarithms; they are replaced with ordinary normalized probabilities.
     """
     # divide and add [ /= ] individual probabilities[person]["gene"] by total .value of genes
     # divide and add [ /= ] individual probabilities[person]["trait"] by total .value of traits
         # this makes relative proportions that sum to 1
     for person in probabilities:
+        for field in ("gene", "trait"):
+            distribution = probabilities[person][field]
+            if log_space:
+                # subtracting the log of the total keeps exp() in range however small the values are
+                total = log_sum(distribution.values())
+                if total == -math.inf:
+                    raise ValueError(f"no probability mass for {person}'s {field}")
+                for i in distribution:
+                    distribution[i] = math.exp(distribution[i] - total)
+            else:
+                total = sum(distribution.values())
+                for i in distribution:
+                    distribution[i] /= total
+
+
+def log(p):
+    """
+    Return the natural logarithm of probability `p`, with log(0) = -inf.
+    """
+    return math.log(p) if p > 0 else -math.inf
+
+
+def log_add(a, b):
+    """
+    Return log(exp(a) + exp(b)) without leaving log space.
+    """
+    if a == -math.inf:
+        return b
+    if b == -math.inf:
+        return a
+    if a < b:
+        a, b = b, a
+    return a + math.log1p(math.exp(b - a))
+
+
+def log_sum(values):
+    """
+    Return the log of the sum of the exponentials of `values` (log-sum-exp).
+    """
+    values = list(values)
+    largest = max(values, default=-math.inf)
+    if largest == -math.inf:
+        return -math.inf
+    return largest + math.log(sum(math.exp(v - largest) for v in values))
+
 
-        t_genes = sum(probabilities[person]["gene"].values())
-        for i in probabilities[person]["gene"]:
-            probabilities[person]["gene"][i] /= t_genes
+def log_joint_probability(people, one_gene, two_genes, have_trait):
+    """
+    Compute and return the natural logarithm of the joint probability
+    described in `joint_probability`, as a sum of log factors so that
+    large families do not underflow.
+    """
+    return sum(
+        log(factor)
+        for factor in joint_factors(people, one_gene, two_genes, have_trait)
+    )
+
+
+def joint_factors(people, one_gene, two_genes, have_trait):
+    """
+    Yield the factors whose product is the joint probability described in
+    `joint_probability`: for each person, the probability of their gene
+    count given their parents' and of their trait given their gene count.
+    """
+    def genes(person):
+        if person is None:
+            return None
+        if person in two_genes:
+            return 2
+        return 1 if person in one_gene else 0
+
+    for person in people:
+        count = genes(person)
+        mother = genes(people[person]["mother"])
+        father = genes(people[person]["father"])
+        if mother is None or father is None:
+            mother = father = None
+        yield gene_distribution(mother, father)[count]
+        yield PROBS["trait"][count][person in have_trait]
+
+
+def pass_probability(genes, mutation):
+    """
+    Return the probability that a parent with `genes` copies of the gene
+    passes the gene on to their child, given the `mutation` probability.
+    """
+    # zero genes: only a mutation passes the gene; two genes: passed unless it mutates away
+    if genes == 0:
+        return mutation
+    elif genes == 1:
+        return 0.5
+    return 1 - mutation
+
+
+@functools.lru_cache(maxsize=None)
+def inheritance_table(mutation):
+    """
+    Return a dictionary mapping each (mother_genes, father_genes) pair to the
+    child's gene distribution for the given `mutation` probability.
+    The table is cached, so every family processed shares one copy.
+    """
+    table = dict()
+    for mother_genes, father_genes in itertools.product((0, 1, 2), repeat=2):
+        mother = pass_probability(mother_genes, mutation)
+        father = pass_probability(father_genes, mutation)
+        table[mother_genes, father_genes] = {
+            2: mother * father,
+            1: mother * (1 - father) + (1 - mother) * father,
+            0: (1 - mother) * (1 - father)
+        }
+    return table
+
+
+def gene_distribution(mother_genes, father_genes):
+    """
+    Return a dictionary mapping 0, 1 and 2 to the probability that a child
+    has that many copies of the gene, given each parent's number of copies.
+    If the parents are unknown (both None), use the unconditional PROBS["gene"].
+    """
+    if mother_genes is None and father_genes is None:
+        return PROBS["gene"]
+    return inheritance_table(PROBS["mutation"])[mother_genes, father_genes]
+
+
+def topological_order(people):
+    """
+    Return a list of the names in `people` ordered so that every parent
+    comes before their children.
+    """
+    order = []
+    visited = set()
+    for person in people:
+        # iterative depth-first search so deep pedigrees do not hit the recursion limit
+        stack = [(person, False)]
+        while stack:
+            name, expanded = stack.pop()
+            if expanded:
+                order.append(name)
+                continue
+            if name in visited:
+                continue
+            visited.add(name)
+            stack.append((name, True))
+            for parent in (people[name]["mother"], people[name]["father"]):
+                if parent is not None and parent not in visited:
+                    stack.append((parent, False))
+    return order
+
+
+def sample(rng, distribution):
+    """
+    Draw one value from `distribution`, a dictionary mapping values to
+    (not necessarily normalized) weights.
+    """
+    threshold = rng.random() * sum(distribution.values())
+    for value, weight in distribution.items():
+        threshold -= weight
+        if threshold < 0:
+            return value
+    return value
+
+
+def parent_genes(people, person, genes):
+    """
+    Return the (mother, father) gene counts of `person` under the gene
+    assignment `genes`, or (None, None) if the parents are unknown.
+    """
+    mother = people[person]["mother"]
+    father = people[person]["father"]
+    if mother is None or father is None:
+        return None, None
+    return genes[mother], genes[father]
+
+
+def likelihood_weighting(people, samples, seed=None):
+    """
+    Approximate each person's gene and trait distribution by likelihood weighting.
+
+    Gene counts are sampled parents first; a known trait is not sampled but
+    instead weights the sample by its probability given the sampled genes.
+    Return `(probabilities, errors)`, where `errors` has the same shape as
+    `probabilities` and holds the standard error of each estimate.
+    """
+    if samples <= 0:
+        raise ValueError("number of samples must be positive")
+    rng = random.Random(seed)
+    order = topological_order(people)
+
+    # weighted counts of each value, and of each value with squared weights for the error
+    weights = new_probabilities(people)
+    squares = new_probabilities(people)
+    total = 0
+    total_squares = 0
+    shift = -math.inf
+
+    for _ in range(samples):
+        genes = dict()
+        traits = dict()
+        log_weight = 0
+        for person in order:
+            genes[person] = sample(rng, gene_distribution(*parent_genes(people, person, genes)))
+            trait = people[person]["trait"]
+            if trait is None:
+                traits[person] = sample(rng, PROBS["trait"][genes[person]])
+            else:
+                traits[person] = trait
+                log_weight += log(PROBS["trait"][genes[person]][trait])
+        if log_weight == -math.inf:
+            continue
 
-        t_traits = sum(probabilities[person]["trait"].values())  
-        for i in probabilities[person]["trait"]:
-            probabilities[person]["trait"][i] /= t_traits
+        # Weights are kept relative to the largest seen so far, so they never underflow
+        if log_weight > shift:
+            scale = math.exp(shift - log_weight)
+            total *= scale
+            total_squares *= scale * scale
+            for person in order:
+                for field in weights[person]:
+                    for value in weights[person][field]:
+                        weights[person][field][value] *= scale
+                        squares[person][field][value] *= scale * scale
+            shift = log_weight
+        weight = math.exp(log_weight - shift)
+
+        total += weight
+        total_squares += weight * weight
+        for person in order:
+            for field, value in (("gene", genes[person]), ("trait", traits[person])):
+                weights[person][field][value] += weight
+                squares[person][field][value] += weight * weight
+
+    if total == 0:
+        raise ValueError("every sample has zero weight, evidence is impossible")
+
+    # variance of a ratio estimator: sum of w^2 (x - p)^2 over (sum of w)^2, with x either 0 or 1
+    probabilities = new_probabilities(people)
+    errors = new_probabilities(people)
+    for person in people:
+        for field in probabilities[person]:
+            for value in probabilities[person][field]:
+                p = weights[person][field][value] / total
+                spread = ((1 - 2 * p) * squares[person][field][value]
+                          + p * p * total_squares)
+                probabilities[person][field][value] = p
+                errors[person][field][value] = math.sqrt(max(spread, 0)) / total
+    return probabilities, errors
+
+
+def gibbs_sampling(people, samples, seed=None, burn_in=None, batches=20):
+    """
+    Approximate each person's gene and trait distribution by Gibbs sampling.
+
+    Each sweep resamples every person's gene count conditioned on their
+    parents, their children (and those children's other parent) and their
+    known trait. The first `burn_in` sweeps are discarded (default: a tenth
+    of `samples`). Return `(probabilities, errors)`, where `errors` are
+    batch-means standard errors over `batches` batches of sweeps.
+    """
+    if samples <= 0:
+        raise ValueError("number of samples must be positive")
+    rng = random.Random(seed)
+    order = topological_order(people)
+    if burn_in is None:
+        burn_in = samples // 10
+    batches = max(1, min(batches, samples))
+
+    children = {person: [] for person in people}
+    for person in people:
+        if people[person]["mother"] is not None and people[person]["father"] is not None:
+            children[people[person]["mother"]].append(person)
+            children[people[person]["father"]].append(person)
+
+    # Start from a sample of the prior; mutation keeps every gene assignment reachable
+    genes = dict()
+    for person in order:
+        genes[person] = sample(rng, gene_distribution(*parent_genes(people, person, genes)))
+
+    def resample(person):
+        # work in log space since a person with many children multiplies many small factors
+        distribution = dict()
+        for count in (0, 1, 2):
+            genes[person] = count
+            p = log(gene_distribution(*parent_genes(people, person, genes))[count])
+            if people[person]["trait"] is not None:
+                p += log(PROBS["trait"][count][people[person]["trait"]])
+            for child in children[person]:
+                p += log(gene_distribution(*parent_genes(people, child, genes))[genes[child]])
+            distribution[count] = p
+        largest = max(distribution.values())
+        genes[person] = sample(rng, {
+            count: math.exp(p - largest) for count, p in distribution.items()
+        })
+
+    for _ in range(burn_in):
+        for person in order:
+            resample(person)
+
+    # Accumulate each batch separately; unknown traits use P(trait | genes) directly
+    batch_sums = [new_probabilities(people) for _ in range(batches)]
+    batch_sizes = [0] * batches
+    for sweep in range(samples):
+        for person in order:
+            resample(person)
+        batch = sweep * batches // samples
+        batch_sizes[batch] += 1
+        for person in order:
+            batch_sums[batch][person]["gene"][genes[person]] += 1
+            trait = people[person]["trait"]
+            for value in (True, False):
+                if trait is None:
+                    batch_sums[batch][person]["trait"][value] += PROBS["trait"][genes[person]][value]
+                else:
+                    batch_sums[batch][person]["trait"][value] += (trait == value)
+
+    probabilities = new_probabilities(people)
+    errors = new_probabilities(people)
+    for person in people:
+        for field in probabilities[person]:
+            for value in probabilities[person][field]:
+                means = [
+                    batch_sums[b][person][field][value] / batch_sizes[b]
+                    for b in range(batches)
+                ]
+                p = sum(means) / batches
+                probabilities[person][field][value] = p
+                if batches > 1:
+                    variance = sum((m - p) ** 2 for m in means) / (batches - 1)
+                    errors[person][field][value] = math.sqrt(variance / batches)
+    return probabilities, errors
 
 
 if __name__ == "__main__":
@@ -0,0 +1,173 @@
+import json
+import os
+import random
+import sys
+import time
+from multiprocessing import Pool
+
+from logic import *
+
+# How each backend answers whether knowledge entails a query
+BACKENDS = ["kb", "sat", "table", "enumerate"]
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) > 1 and sys.argv[1] == "generate":
+        if len(sys.argv) not in [4, 5, 6]:
+            sys.exit("Usage: python batch.py generate count inhabitants [depth] [seed]")
+        count = int(sys.argv[2])
+        inhabitants = int(sys.argv[3])
+        depth = int(sys.argv[4]) if len(sys.argv) > 4 else 2
+        seed = int(sys.argv[5]) if len(sys.argv) > 5 else 0
+        for number in range(count):
+            knowledge, queries = generate_puzzle(inhabitants, depth, seed + number)
+            print(json.dumps(puzzle_record(number, knowledge, queries), ensure_ascii=False))
+        return
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python batch.py (puzzles.jsonl | -) [workers] [kb|sat|table|enumerate]")
+
+    # Each line is {"puzzle": id, "nodes": [...], "knowledge": [roots], "queries": [roots]},
+    # with sentences serialized by logic.serialize
+    source = sys.argv[1]
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    backend = sys.argv[3] if len(sys.argv) > 3 else "kb"
+    if backend not in BACKENDS:
+        sys.exit(f"Unknown backend: {backend}")
+
+    f = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    with f:
+        lines = [line for line in f if line.strip()]
+
+    # Workers receive the JSON lines themselves, which are far cheaper to
+    # send than pickled sentence graphs
+    start = time.perf_counter()
+    puzzles = queries = 0
+    with Pool(workers) as pool:
+        jobs = ((line, backend) for line in lines)
+        for record in pool.imap_unordered(solve, jobs, chunksize=8):
+            print(json.dumps(record, ensure_ascii=False), flush=True)
+            puzzles += 1
+            queries += record.get("queries", 0)
+    elapsed = time.perf_counter() - start
+    print(f"{puzzles} puzzles, {queries} queries in {elapsed:.2f}s "
+          f"({puzzles / elapsed if elapsed else 0:.1f} puzzles/s, "
+          f"{queries / elapsed if elapsed else 0:.1f} queries/s)", file=sys.stderr)
+
+
+def generate_puzzle(inhabitants, depth=2, seed=None):
+    """
+    Generate a random knights-and-knaves puzzle with `inhabitants` people,
+    each of whom makes one statement about the others nested up to `depth`
+    connectives deep, like "B says 'A said I am a knave'".
+
+    Return the knowledge as a list of sentences, and a query for whether
+    each person is a knight and whether each is a knave. The statements are
+    chosen to be consistent with a hidden assignment, so the knowledge
+    always has at least one model.
+    """
+    rng = random.Random(seed)
+    names = [person_name(number) for number in range(inhabitants)]
+    knights = [Symbol(f"{name} is a Knight") for name in names]
+    knaves = [Symbol(f"{name} is a Knave") for name in names]
+    world = [rng.random() < 0.5 for _ in names]
+
+    knowledge = []
+    for knight, knave in zip(knights, knaves):
+        knowledge.append(Or(knight, knave))
+        knowledge.append(Not(And(knight, knave)))
+
+    for speaker in range(inhabitants):
+        statement, value = random_statement(rng, knights, knaves, world, depth)
+
+        # a knight's statement is true and a knave's is false
+        if value != world[speaker]:
+            statement, value = Not(statement), not value
+        knowledge.append(Biconditional(knights[speaker], statement))
+
+    queries = [symbol for pair in zip(knights, knaves) for symbol in pair]
+    return knowledge, queries
+
+
+def random_statement(rng, knights, knaves, world, depth):
+    """
+    Return a random statement about the inhabitants and its truth value in
+    `world`, a list of whether each inhabitant is a knight.
+    """
+    person = rng.randrange(len(world))
+    if depth == 0 or rng.random() < 0.3:
+        if rng.random() < 0.5:
+            return knights[person], world[person]
+        return knaves[person], not world[person]
+
+    left, a = random_statement(rng, knights, knaves, world, depth - 1)
+    right, b = random_statement(rng, knights, knaves, world, depth - 1)
+    kind = rng.randrange(5)
+    if kind == 0:
+        # "X said '...'": true exactly when X is a knight and the quote holds, or neither
+        return Biconditional(knights[person], left), world[person] == a
+    elif kind == 1:
+        return And(left, right), a and b
+    elif kind == 2:
+        return Or(left, right), a or b
+    elif kind == 3:
+        return Implication(left, right), (not a) or b
+    return Biconditional(left, right), a == b
+
+
+def person_name(number):
+    """Return a name for the inhabitant numbered `number`: A to Z, then A1 on."""
+    letter = chr(ord("A") + number % 26)
+    return letter if number < 26 else f"{letter}{number // 26}"
+
+
+def puzzle_record(puzzle, knowledge, queries):
+    """Return the JSON-serializable record of a puzzle, as read by `solve`."""
+    nodes, roots = serialize(knowledge + queries)
+    return {
+        "puzzle": puzzle,
+        "nodes": nodes,
+        "knowledge": roots[:len(knowledge)],
+        "queries": roots[len(knowledge):]
+    }
+
+
+def solve(job):
+    """
+    Answer every query of one puzzle, given as a line of JSON, with one
+    backend, and return the queries entailed and how long answering took.
+    """
+    line, backend = job
+    start = time.perf_counter()
+    try:
+        record = json.loads(line)
+        sentences = deserialize(record["nodes"], record["knowledge"] + record["queries"])
+    except (ValueError, KeyError, IndexError, TypeError) as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+    knowledge = sentences[:len(record["knowledge"])]
+    queries = sentences[len(record["knowledge"]):]
+
+    if backend == "kb":
+        base = KnowledgeBase(*knowledge)
+        entailed = [query for query in queries if base.ask(query)]
+    else:
+        check = {
+            "sat": model_check,
+            "table": model_check_parallel,
+            "enumerate": model_check_enumerate
+        }[backend]
+        knowledge = And(*knowledge)
+        entailed = [query for query in queries if check(knowledge, query)]
+
+    return {
+        "puzzle": record.get("puzzle"),
+        "backend": backend,
+        "queries": len(queries),
+        "entailed": [query.formula() for query in entailed],
+        "seconds": time.perf_counter() - start
+    }
+
+
+if __name__ == "__main__":
+    main()
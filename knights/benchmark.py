@@ -0,0 +1,219 @@
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+from logic import *
+from batch import generate_puzzle
+from sat import Solver
+import puzzle
+
+# Backends that scale exponentially are skipped above this many symbols
+SYMBOL_LIMITS = {"dpll": 100, "table": 20, "enumerate": 14}
+
+# The four puzzles of puzzle.py, with the symbols each one entails
+FIXTURES = [
+    ("puzzle0", puzzle.knowledge0, [puzzle.AKnave]),
+    ("puzzle1", puzzle.knowledge1, [puzzle.AKnave, puzzle.BKnight]),
+    ("puzzle2", puzzle.knowledge2, [puzzle.AKnave, puzzle.BKnight]),
+    ("puzzle3", puzzle.knowledge3, [puzzle.AKnight, puzzle.BKnave, puzzle.CKnight])
+]
+
+# Random 3-SAT instances, as (variables, seed), at the phase-transition ratio
+RANDOM_3SAT = [(20, 0), (50, 1), (100, 2), (150, 3)]
+
+# Generated knights puzzles, as (inhabitants, depth, seed)
+KNIGHTS = [(4, 3, 0), (8, 3, 1), (16, 3, 2), (32, 3, 3)]
+
+COLUMNS = ["queries", "entailed", "decisions", "seconds", "peak KiB"]
+
+
+def main():
+
+    # Check usage
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [report.jsonl]")
+    report = sys.argv[1] if len(sys.argv) > 1 else None
+
+    print(f"{'problem':<18}{'symbols':>8}  {'backend':<10}{'result':<8}"
+          + "".join(f"{column:>12}" for column in COLUMNS))
+    records = []
+    for name, knowledge, queries, expected in problems():
+        for backend in BACKENDS:
+            record = benchmark(backend, knowledge, queries)
+            record.update(problem=name)
+
+            # every backend must agree with the fixture, or with the first backend
+            if record["result"] == "ok":
+                if expected is None:
+                    expected = record["answers"]
+                elif record["answers"] != expected:
+                    record["result"] = "wrong"
+            record.pop("answers", None)
+            records.append(record)
+            print(f"{name:<18}{record['symbols']:>8}  {backend:<10}{record['result']:<8}"
+                  + "".join(f"{format_value(record.get(column)):>12}" for column in COLUMNS))
+
+    # model counting must agree with a truth table, including on knowledge
+    # whose symbols only appear in tautologies
+    print()
+    print(f"{'problem':<18}{'symbols':>8}  {'table':>8}{'count':>8}{'enumerate':>10}")
+    for name, knowledge in counting_problems():
+        symbols = sorted(knowledge.symbol_names())
+        check = compile_sentence(knowledge, symbols)
+        table = sum(1 for model in range(2 ** len(symbols)) if check(model))
+        counted = count_models(knowledge)
+        enumerated = sum(1 for model in enumerate_models(knowledge))
+        result = "ok" if table == counted == enumerated else "wrong"
+        print(f"{name:<18}{len(symbols):>8}  {table:>8}{counted:>8}{enumerated:>10}  {result}")
+
+    if report:
+        with open(report, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+
+
+def problems():
+    """
+    Yield each benchmark problem as (name, knowledge, queries, expected),
+    where `knowledge` is a list of sentences and `expected` is the list of
+    answers to `queries` if known in advance, or None.
+    """
+    everyone = [
+        puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+        puzzle.BKnave, puzzle.CKnight, puzzle.CKnave
+    ]
+    for name, knowledge, entailed in FIXTURES:
+        yield name, knowledge.conjuncts, everyone, [
+            symbol in entailed for symbol in everyone
+        ]
+
+    # a formula is unsatisfiable exactly when it entails the empty disjunction
+    for variables, seed in RANDOM_3SAT:
+        yield f"3sat-{variables}", random_ksat(variables, seed=seed), [Or()], None
+
+    for inhabitants, depth, seed in KNIGHTS:
+        knowledge, queries = generate_puzzle(inhabitants, depth, seed)
+        yield f"knights-{inhabitants}", knowledge, queries, None
+
+
+def counting_problems():
+    """
+    Yield (name, knowledge) pairs small enough to count by truth table.
+    """
+    a, b = Symbol("A"), Symbol("B")
+    yield "tautology", And(Or(a, Not(a)))
+    yield "tautology-and", And(a, Or(b, Not(b)))
+    for name, knowledge, entailed in FIXTURES:
+        yield name, knowledge
+    yield "3sat-12", And(*random_ksat(12, ratio=3, seed=4))
+
+
+def random_ksat(variables, ratio=4.26, k=3, seed=None):
+    """
+    Return a random k-SAT formula as a list of clauses, each an Or of `k`
+    literals over distinct symbols, with `ratio` clauses per variable.
+    Near 4.26 for 3-SAT, about half of all formulas are satisfiable and
+    they are hardest to decide.
+    """
+    rng = random.Random(seed)
+    symbols = [Symbol(f"x{i}") for i in range(variables)]
+    clauses = []
+    for _ in range(round(ratio * variables)):
+        clauses.append(Or(*[
+            symbol if rng.random() < 0.5 else Not(symbol)
+            for symbol in rng.sample(symbols, k)
+        ]))
+    return clauses
+
+
+def solve_sat(knowledge, queries, learn=True):
+    """Answer each query with a fresh solver, as model_check does."""
+    answers = []
+    decisions = 0
+    for query in queries:
+        cnf = CNF()
+        cnf.add(And(*knowledge))
+        cnf.add(Not(query))
+        solver = Solver(cnf.clauses, learn=learn)
+        answers.append(not solver.solve())
+        decisions += solver.decisions
+    return answers, decisions
+
+
+def solve_dpll(knowledge, queries):
+    """Answer each query with a solver that does not learn clauses."""
+    return solve_sat(knowledge, queries, learn=False)
+
+
+def solve_kb(knowledge, queries):
+    """Answer every query from one incremental knowledge base."""
+    base = KnowledgeBase(*knowledge)
+    answers = [base.ask(query) for query in queries]
+    return answers, base.solver.decisions
+
+
+def solve_table(knowledge, queries):
+    """Answer each query with the bit-parallel truth table."""
+    knowledge = And(*knowledge)
+    return [model_check_parallel(knowledge, query) for query in queries], None
+
+
+def solve_enumerate(knowledge, queries):
+    """Answer each query by evaluating one model at a time."""
+    knowledge = And(*knowledge)
+    return [model_check_enumerate(knowledge, query) for query in queries], None
+
+
+BACKENDS = {
+    "sat": solve_sat,
+    "dpll": solve_dpll,
+    "kb": solve_kb,
+    "table": solve_table,
+    "enumerate": solve_enumerate
+}
+
+
+def benchmark(backend, knowledge, queries):
+    """
+    Answer the queries against the knowledge with one backend, and return
+    a record of the answers, time, decisions and peak memory allocated.
+    """
+    symbols = len(frozenset().union(
+        *[sentence.symbol_names() for sentence in knowledge + queries]
+    ))
+    record = {"backend": backend, "symbols": symbols, "queries": len(queries)}
+    if symbols > SYMBOL_LIMITS.get(backend, symbols):
+        record["result"] = "skipped"
+        return record
+
+    # time one run, then measure memory in another, since tracing slows it down
+    start = time.perf_counter()
+    answers, decisions = BACKENDS[backend](knowledge, queries)
+    record["seconds"] = time.perf_counter() - start
+    tracemalloc.start()
+    try:
+        BACKENDS[backend](knowledge, queries)
+        record["peak KiB"] = tracemalloc.get_traced_memory()[1] // 1024
+    finally:
+        tracemalloc.stop()
+
+    record.update(
+        result="ok",
+        answers=answers,
+        entailed=sum(answers),
+        decisions=decisions
+    )
+    return record
+
+
+def format_value(value):
+    """Format a statistic for the report table."""
+    if value is None:
+        return "-"
+    return f"{value:.4f}" if isinstance(value, float) else str(value)
+
+
+if __name__ == "__main__":
+    main()
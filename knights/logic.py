@@ -1,7 +1,84 @@
 import itertools
+import weakref
+from multiprocessing import Pool
+
+from sat import Solver
+
+# Truth tables are checked in words of 2 ** WORD_BITS models, one per bit
+WORD_BITS = 12
+
+# A knowledge base with at most this many symbols keeps its models
+MODEL_SYMBOLS = 16
+
+# Every sentence in use, by class and constructor arguments
+INTERNED = weakref.WeakValueDictionary()
 
 
 class Sentence():
+    """
+    Sentences are hash-consed: constructing a sentence equal to one that
+    already exists returns the existing object, so repeated subterms share
+    memory and usually compare by identity. Each shared sentence caches its
+    hash and its set of symbols when it is built.
+
+    And.add can change a conjunction after it is built, so a new And is
+    never shared. It is frozen the first time it is hashed or used inside
+    another sentence: from then on it caches its hash and symbols like any
+    other sentence, and adding to it raises an exception.
+    """
+
+    __slots__ = ("__weakref__", "_hash", "_symbols")
+
+    def __new__(cls, *arguments):
+        for argument in arguments:
+            if isinstance(argument, And):
+                argument.freeze()
+        fixed = cls is not And and (cls is Symbol or all(
+            isinstance(argument, Sentence) and argument._hash is not None
+            for argument in arguments
+        ))
+        if fixed:
+            key = (cls, arguments)
+            sentence = INTERNED.get(key)
+            if sentence is not None:
+                return sentence
+
+        sentence = super().__new__(cls)
+        sentence.build(*arguments)
+        if fixed:
+            sentence._hash = sentence.digest()
+            sentence._symbols = sentence.collect()
+            INTERNED[key] = sentence
+        else:
+            sentence._hash = None
+            sentence._symbols = None
+        return sentence
+
+    def __reduce__(self):
+        return (type(self), self.arguments())
+
+    def __hash__(self):
+        return self._hash
+
+    def build(self, *arguments):
+        """Sets the parts of a new sentence."""
+        raise Exception("nothing to build")
+
+    def digest(self):
+        """Computes the hash of the sentence from its parts."""
+        raise Exception("nothing to hash")
+
+    def collect(self):
+        """Computes the frozenset of symbol names in the sentence from its parts."""
+        return frozenset()
+
+    def symbol_names(self):
+        """Returns a frozenset of the names of all symbols in the sentence."""
+        return self.collect() if self._symbols is None else self._symbols
+
+    def arguments(self):
+        """Returns the constructor arguments of the sentence."""
+        return ()
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +90,15 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_names())
+
+    def encode(self, cnf):
+        """Adds clauses defining the sentence to `cnf` and returns its literal."""
+        raise Exception("nothing to encode")
+
+    def expression(self, program):
+        """Returns a bitwise Python expression for the sentence in `program`."""
+        raise Exception("nothing to compile")
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +129,26 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
+    __slots__ = ("name",)
+
+    def build(self, name):
         self.name = name
 
+    def digest(self):
+        return hash(("symbol", self.name))
+
+    def collect(self):
+        return frozenset([self.name])
+
+    def arguments(self):
+        return (self.name,)
+
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (
+            isinstance(other, Symbol) and self.name == other.name
+        )
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return self.name
@@ -65,20 +162,37 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def encode(self, cnf):
+        return cnf.symbol(self.name)
+
+    def expression(self, program):
+        return program.symbol(self.name)
 
 
 class Not(Sentence):
-    def __init__(self, operand):
+
+    __slots__ = ("operand",)
+
+    def build(self, operand):
         Sentence.validate(operand)
         self.operand = operand
 
+    def digest(self):
+        return hash(("not", hash(self.operand)))
+
+    def collect(self):
+        return self.operand.symbol_names()
+
+    def arguments(self):
+        return (self.operand,)
+
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (
+            isinstance(other, Not) and hash(self) == hash(other)
+            and self.operand == other.operand
+        )
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -89,24 +203,52 @@ class Not(Sentence):
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def encode(self, cnf):
+        return -cnf.literal(self.operand)
+
+    def expression(self, program):
+        return f"full ^ {program.value(self.operand)}"
 
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
+
+    __slots__ = ("conjuncts",)
+
+    def build(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
+    def digest(self):
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
 
+    def collect(self):
+        return frozenset().union(
+            *[conjunct.symbol_names() for conjunct in self.conjuncts]
+        )
+
+    def arguments(self):
+        return tuple(self.conjuncts)
+
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, And) and hash(self) == hash(other)
+            and self.conjuncts == other.conjuncts
+        )
+
+    def __hash__(self):
+        if self._hash is None:
+            self.freeze()
+        return self._hash
+
+    def freeze(self):
+        """Fixes the conjuncts, caching the hash and symbols they determine."""
+        if self._hash is None:
+            self._hash = self.digest()
+            self._symbols = self.collect()
+
     def __repr__(self):
         conjunctions = ", ".join(
             [str(conjunct) for conjunct in self.conjuncts]
@@ -115,6 +257,8 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        if self._hash is not None:
+            raise Exception("conjunction is already in use and cannot change")
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
@@ -126,24 +270,49 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def encode(self, cnf):
+        conjuncts = [cnf.literal(conjunct) for conjunct in self.conjuncts]
+        v = cnf.variable()
+        for c in conjuncts:
+            cnf.clauses.append([-v, c])
+        cnf.clauses.append([v] + [-c for c in conjuncts])
+        return v
+
+    def expression(self, program):
+        conjuncts = [program.value(conjunct) for conjunct in self.conjuncts]
+        return " & ".join(conjuncts) or "full"
 
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
+
+    __slots__ = ("disjuncts",)
+
+    def build(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
-
-    def __hash__(self):
+    def digest(self):
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
 
+    def collect(self):
+        return frozenset().union(
+            *[disjunct.symbol_names() for disjunct in self.disjuncts]
+        )
+
+    def arguments(self):
+        return tuple(self.disjuncts)
+
+    def __eq__(self, other):
+        return self is other or (
+            isinstance(other, Or) and hash(self) == hash(other)
+            and self.disjuncts == other.disjuncts
+        )
+
+    __hash__ = Sentence.__hash__
+
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
@@ -157,24 +326,48 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def encode(self, cnf):
+        disjuncts = [cnf.literal(disjunct) for disjunct in self.disjuncts]
+        v = cnf.variable()
+        for d in disjuncts:
+            cnf.clauses.append([v, -d])
+        cnf.clauses.append([-v] + disjuncts)
+        return v
+
+    def expression(self, program):
+        disjuncts = [program.value(disjunct) for disjunct in self.disjuncts]
+        return " | ".join(disjuncts) or "0"
 
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def build(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
 
+    def digest(self):
+        return hash(
+            ("implies", hash(self.antecedent), hash(self.consequent))
+        )
+
+    def collect(self):
+        return self.antecedent.symbol_names() | self.consequent.symbol_names()
+
+    def arguments(self):
+        return (self.antecedent, self.consequent)
+
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (
+            isinstance(other, Implication) and hash(self) == hash(other)
+            and self.antecedent == other.antecedent
+            and self.consequent == other.consequent
+        )
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -188,76 +381,547 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def encode(self, cnf):
+        a = cnf.literal(self.antecedent)
+        b = cnf.literal(self.consequent)
+        v = cnf.variable()
+        cnf.clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+        return v
+
+    def expression(self, program):
+        a = program.value(self.antecedent)
+        b = program.value(self.consequent)
+        return f"(full ^ {a}) | {b}"
 
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def build(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
 
+    def digest(self):
+        return hash(("biconditional", hash(self.left), hash(self.right)))
+
+    def collect(self):
+        return self.left.symbol_names() | self.right.symbol_names()
+
+    def arguments(self):
+        return (self.left, self.right)
+
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (
+            isinstance(other, Biconditional) and hash(self) == hash(other)
+            and self.left == other.left
+            and self.right == other.right
+        )
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    __hash__ = Sentence.__hash__
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return self.left.evaluate(model) == self.right.evaluate(model)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def encode(self, cnf):
+        a = cnf.literal(self.left)
+        b = cnf.literal(self.right)
+        v = cnf.variable()
+        cnf.clauses.extend([[-v, -a, b], [-v, a, -b], [v, a, b], [v, -a, -b]])
+        return v
+
+    def expression(self, program):
+        a = program.value(self.left)
+        b = program.value(self.right)
+        return f"full ^ {a} ^ {b}"
+
+
+# Operator of each compound sentence class in serialized sentences
+OPERATORS = {
+    Not: "¬",
+    And: "∧",
+    Or: "∨",
+    Implication: "=>",
+    Biconditional: "<=>"
+}
+
+
+def serialize(sentences):
+    """
+    Serializes a list of sentences into JSON-compatible data.
+
+    Returns `(nodes, roots)`: `nodes` lists every distinct subsentence once,
+    children before parents, as a symbol's name or as an operator followed
+    by the indices of its parts; `roots` gives the index of each sentence.
+    Shared subterms are written once, so the nodes grow with the number of
+    distinct subsentences rather than the size of the trees.
+    """
+    nodes = []
+    indices = dict()
+
+    def visit(sentence):
+        if sentence not in indices:
+            if isinstance(sentence, Symbol):
+                node = sentence.name
+            else:
+                node = [OPERATORS[type(sentence)]] + [
+                    visit(part) for part in sentence.arguments()
+                ]
+            indices[sentence] = len(nodes)
+            nodes.append(node)
+        return indices[sentence]
+
+    roots = [visit(sentence) for sentence in sentences]
+    return nodes, roots
+
+
+def deserialize(nodes, roots):
+    """Returns the list of sentences at `roots` in serialized `nodes`."""
+    classes = {operator: cls for cls, operator in OPERATORS.items()}
+    sentences = []
+    for node in nodes:
+        if isinstance(node, str):
+            sentences.append(Symbol(node))
+        else:
+            sentences.append(classes[node[0]](
+                *[sentences[part] for part in node[1:]]
+            ))
+    return [sentences[root] for root in roots]
+
+
+class CNF():
+    """
+    Clauses in conjunctive normal form, compiled from sentences by the
+    Tseitin encoding: each compound subsentence gets a new variable defined
+    to be equivalent to it, so the clauses grow linearly with the sentence.
+    Variables are numbered from 1; a literal is a variable or its negation.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.variables = 0
+        self.symbols = dict()
+        self.definitions = dict()
+
+    def variable(self):
+        """Returns a new variable."""
+        self.variables += 1
+        return self.variables
+
+    def symbol(self, name):
+        """Returns the variable of the symbol called `name`."""
+        if name not in self.symbols:
+            self.symbols[name] = self.variable()
+        return self.symbols[name]
+
+    def literal(self, sentence):
+        """Returns a literal equivalent to `sentence`, encoding it if new."""
+        Sentence.validate(sentence)
+        if sentence not in self.definitions:
+            self.definitions[sentence] = sentence.encode(self)
+        return self.definitions[sentence]
+
+    def add(self, sentence):
+        """Adds clauses asserting that `sentence` is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append(
+                [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            )
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+class Program():
+    """
+    Straight-line Python code computing a sentence with bitwise operators,
+    compiled into a function of one model given as a bitmask: bit i is set
+    when the i-th of `symbols` is true.
+
+    Every subsentence becomes one local variable, computed once even if it
+    appears many times, so evaluating a model needs no recursion, method
+    calls or dictionary lookups.
+
+    With `bits` above 0, the function instead evaluates a word of 2 ** bits
+    models at once, one model per bit of a Python integer: model number
+    2 ** bits * m + j is bit j of the result for block m, so the first
+    `bits` symbols follow fixed patterns within the word and the rest are
+    constant across it.
+    """
+
+    def __init__(self, symbols, bits=0):
+        self.positions = {name: i for i, name in enumerate(symbols)}
+        self.bits = bits
+        self.lines = []
+        self.values = dict()
+
+    def local(self, expression):
+        """Adds a line computing `expression` and returns its variable."""
+        name = f"t{len(self.lines)}"
+        self.lines.append(f"{name} = {expression}")
+        return name
+
+    def symbol(self, name):
+        """Returns the variable holding the value of the symbol called `name`."""
+        if name not in self.positions:
+            raise Exception(f"variable {name} not in model")
+        i = self.positions[name]
+        if not self.bits:
+            return self.local(f"m >> {i} & 1")
+        if i < self.bits:
+            return f"p{i}"
+        return self.local(f"-(m >> {i - self.bits} & 1) & full")
+
+    def value(self, sentence):
+        """Returns the variable holding the value of `sentence`, compiling it if new."""
+        Sentence.validate(sentence)
+        if sentence not in self.values:
+            expression = sentence.expression(self)
+            if not expression.isidentifier():
+                expression = self.local(expression)
+            self.values[sentence] = expression
+        return self.values[sentence]
+
+    def function(self, sentence):
+        """
+        Returns a function of a bitmask that is 1 if `sentence` is true in
+        it, else 0; or, with `bits`, a function of a block number returning
+        the word of the sentence's values in that block.
+        """
+        result = self.value(sentence)
+        size = 2 ** self.bits
+
+        # word constants are bound as default arguments, which are locals
+        patterns = [
+            sum(1 << j for j in range(size) if j >> i & 1)
+            for i in range(self.bits)
+        ]
+        namespace = {"FULL": (1 << size) - 1, "PATTERNS": patterns}
+        arguments = "".join(f", p{i}=PATTERNS[{i}]" for i in range(self.bits))
+        body = "".join(f"    {line}\n" for line in self.lines)
+        source = f"def evaluate(m, full=FULL{arguments}):\n{body}    return {result}\n"
+        exec(source, namespace)
+        return namespace["evaluate"]
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Compiles `sentence` into a function of a model given as a bitmask over
+    the list `symbols`, returning 1 if the sentence is true in it, else 0.
+    """
+    return Program(symbols).function(sentence)
+
+
+class KnowledgeBase():
+    """
+    A knowledge base that is told sentences one at a time and asked many
+    queries in between.
+
+    Every sentence told is encoded into one incremental solver, so clauses
+    learned while answering one query speed up the next; a query is
+    entailed when the solver finds no model with it assumed false. While
+    the knowledge base has few enough symbols, its satisfying models are
+    listed once instead, and each query is just checked against them.
+    Answers are cached until the next sentence is told.
+    """
+
+    def __init__(self, *sentences):
+        self.sentences = []
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.encoded = 0
+
+        # symbol names and satisfying models as bitmasks over them, once listed
+        self.names = None
+        self.models = None
+        self.answers = dict()
+        for sentence in sentences:
+            self.tell(sentence)
+
+    def tell(self, sentence):
+        """Adds `sentence` to the knowledge base."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.cnf.add(sentence)
+        self.flush()
+        self.names = None
+        self.models = None
+        self.answers.clear()
+
+    def flush(self):
+        """Passes clauses not yet seen by the solver on to it."""
+        for clause in self.cnf.clauses[self.encoded:]:
+            self.solver.add_clause(clause)
+        self.encoded = len(self.cnf.clauses)
+
+    def ask(self, query):
+        """Returns True if the knowledge base entails `query`."""
+        Sentence.validate(query)
+        if query not in self.answers:
+            if self.names is None:
+                self.enumerate()
+            if self.models is not None and query.symbol_names() <= set(self.names):
+                evaluate = compile_sentence(query, self.names)
+                answer = all(evaluate(model) for model in self.models)
+            else:
+                # defining the query's literal only constrains new variables,
+                # so its clauses can stay in the solver for later queries
+                literal = self.cnf.literal(query)
+                self.flush()
+                answer = not self.solver.solve([-literal])
+            self.answers[query] = answer
+        return self.answers[query]
+
+    def enumerate(self):
+        """Lists the satisfying models, if there are few enough symbols."""
+        self.names = sorted(frozenset().union(
+            *[sentence.symbol_names() for sentence in self.sentences]
+        ))
+        if len(self.names) > MODEL_SYMBOLS:
+            return
+
+        # evaluate the truth table a word at a time and keep each set bit
+        bits = min(WORD_BITS, len(self.names))
+        evaluate = Program(self.names, bits).function(And(*self.sentences))
+        self.models = []
+        for block in range(2 ** (len(self.names) - bits)):
+            word = evaluate(block)
+            while word:
+                low = word & -word
+                self.models.append(block << bits | low.bit_length() - 1)
+                word ^= low
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
+    # knowledge entails query exactly when knowledge ∧ ¬query has no model
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return not Solver(cnf.clauses).solve()
 
-        # If model has an assignment for each symbol
-        if not symbols:
 
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+def model_check_parallel(knowledge, query, processes=1, bits=WORD_BITS):
+    """
+    Checks if knowledge base entails query, by evaluating the truth table
+    in words of 2 ** bits models at a time, split across `processes`.
+    """
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    bits = min(bits, len(symbols))
+    blocks = 2 ** (len(symbols) - bits)
+
+    # A counter-model is one where knowledge is true and query is false
+    counter = And(knowledge, Not(query))
+    if processes == 1 or blocks < processes:
+        return check_blocks((counter, symbols, bits, 0, blocks))
+
+    # Several chunks per process balance the load; the first counter-model
+    # found stops the sweep, and leaving the pool terminates the rest
+    chunk = -(-blocks // (processes * 4))
+    jobs = [
+        (counter, symbols, bits, start, min(start + chunk, blocks))
+        for start in range(0, blocks, chunk)
+    ]
+    with Pool(processes) as pool:
+        for entailed in pool.imap_unordered(check_blocks, jobs):
+            if not entailed:
+                return False
+    return True
+
+
+def check_blocks(job):
+    """
+    Checks that a sentence is false in every model of a range of blocks of
+    its truth table, stopping at the first model where it is true.
+    """
+    sentence, symbols, bits, start, stop = job
+    evaluate = Program(symbols, bits).function(sentence)
+    for block in range(start, stop):
+        if evaluate(block):
+            return False
+    return True
+
+
+def model_check_enumerate(knowledge, query):
+    """Checks if knowledge base entails query, by enumerating all models."""
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    # Get all symbols in both knowledge and query
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+
+    # Compile both sentences over models numbered 0 to 2^n - 1
+    knowledge = compile_sentence(knowledge, symbols)
+    query = compile_sentence(query, symbols)
+
+    # If knowledge base is true in a model, then query must also be true
+    for model in range(2 ** len(symbols)):
+        if knowledge(model) and not query(model):
+            return False
+    return True
+
+
+def count_models(knowledge, symbols=()):
+    """
+    Returns the number of models of `knowledge` over its own symbols and
+    any others in `symbols`, counted without listing them.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    clauses = frozenset(
+        tuple(sorted(set(clause))) for clause in cnf.clauses
+        if not any(-literal in clause for literal in clause)
+    )
+
+    # Tseitin variables are fixed by the symbols, so counting assignments to
+    # every variable counts models; a variable left in no clause is free
+    variables = {abs(literal) for clause in clauses for literal in clause}
+    free = cnf.variables - len(variables)
+    extra = len(set(symbols) - knowledge.symbol_names())
+    if () in clauses:
+        return 0
+    return count_clauses(clauses, dict()) * 2 ** (free + extra)
+
+
+def count_clauses(clauses, cache):
+    """
+    Counts the assignments to the variables of `clauses`, a frozenset of
+    tuples of literals, that satisfy every clause.
+
+    Clauses sharing no variables are counted separately and multiplied, and
+    each such component's count is cached, since the same component often
+    reappears under different assignments of the rest.
+    """
+    if not clauses:
+        return 1
+    if clauses in cache:
+        return cache[clauses]
+
+    components = split_components(clauses)
+    if len(components) > 1:
+        total = 1
+        for component in components:
+            total *= count_clauses(component, cache)
+            if not total:
+                break
+    else:
+        # branch on the variable in the most clauses
+        occurrences = dict()
+        for clause in clauses:
+            for literal in clause:
+                occurrences[abs(literal)] = occurrences.get(abs(literal), 0) + 1
+        variable = max(occurrences, key=occurrences.get)
+        total = 0
+        for literal in [variable, -variable]:
+            simplified, assigned = simplify(clauses, literal)
+            if simplified is None:
+                continue
+
+            # variables that vanished without being assigned are free
+            remaining = {abs(other) for clause in simplified for other in clause}
+            free = len(occurrences) - assigned - len(remaining)
+            total += count_clauses(simplified, cache) * 2 ** free
+
+    cache[clauses] = total
+    return total
+
+
+def split_components(clauses):
+    """Splits `clauses` into frozensets of clauses connected by shared variables."""
+    by_variable = dict()
+    for clause in clauses:
+        for literal in clause:
+            by_variable.setdefault(abs(literal), []).append(clause)
+
+    components = []
+    seen = set()
+    for clause in clauses:
+        if clause in seen:
+            continue
+        seen.add(clause)
+        component = [clause]
+        frontier = [clause]
+        while frontier:
+            for literal in frontier.pop():
+                for other in by_variable.pop(abs(literal), ()):
+                    if other not in seen:
+                        seen.add(other)
+                        component.append(other)
+                        frontier.append(other)
+        components.append(frozenset(component))
+    return components
+
+
+def simplify(clauses, literal):
+    """
+    Makes `literal` true in `clauses` and propagates unit clauses.
+    Returns the remaining clauses and the number of variables assigned, or
+    (None, 0) if some clause became false.
+    """
+    true = {literal}
+    changed = True
+    while changed:
+        changed = False
+        simplified = set()
+        for clause in clauses:
+            if any(other in true for other in clause):
+                continue
+            remaining = tuple(other for other in clause if -other not in true)
+            if not remaining:
+                return None, 0
+            if len(remaining) == 1:
+                true.add(remaining[0])
+                changed = True
+            else:
+                simplified.add(remaining)
+        clauses = simplified
+    return frozenset(clauses), len(true)
+
+
+def enumerate_models(knowledge, symbols=()):
+    """
+    Yields the models of `knowledge` one at a time, as dictionaries from
+    each symbol name (including any others in `symbols`) to its value.
+
+    Each model is found by the solver, which is then told to exclude that
+    assignment of the knowledge's symbols, so models are never all held
+    in memory at once.
+    """
+    cnf = CNF()
+    cnf.add(knowledge)
+    names = sorted(knowledge.symbol_names())
+    extra = sorted(set(symbols) - knowledge.symbol_names())
+    for name in names:
+        cnf.symbol(name)
+
+    # the solver drops tautological clauses, so a symbol found only in them
+    # would otherwise never get a variable, or a value in the model
+    solver = Solver(cnf.clauses)
+    solver.ensure(cnf.variables)
+
+    while solver.solve():
+        model = {name: solver.model[cnf.symbols[name]] for name in names}
+
+        # symbols the knowledge does not mention take every combination of values
+        for values in itertools.product([False, True], repeat=len(extra)):
+            model.update(zip(extra, values))
+            yield dict(model)
+
+        # block this assignment of the knowledge's symbols
+        solver.add_clause([
+            -cnf.symbols[name] if model[name] else cnf.symbols[name]
+            for name in names
+        ])
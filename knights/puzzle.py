@@ -92,8 +92,10 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            # one knowledge base answers every symbol's query
+            knowledge = KnowledgeBase(knowledge)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if knowledge.ask(symbol):
                     print(f"    {symbol}")
 
 
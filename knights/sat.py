@@ -0,0 +1,332 @@
+import heapq
+
+
+class Solver():
+    """
+    A SAT solver for clauses in conjunctive normal form.
+
+    Variables are positive integers and a literal is a variable (true) or
+    its negation (false), as in the DIMACS format; a clause is a list of
+    literals, at least one of which must be true.
+
+    Search assigns variables one decision at a time and propagates unit
+    clauses with two watched literals per clause. With `learn` True (CDCL),
+    each conflict is analysed into a learned clause and search jumps back
+    to the level where that clause becomes unit; with `learn` False
+    (plain DPLL), search undoes the most recent decision and tries its
+    opposite instead.
+
+    Clauses may be added between calls to `solve`, and learned clauses are
+    kept, so one solver can answer many related questions.
+    """
+
+    def __init__(self, clauses=(), learn=True):
+        self.learn = learn
+        self.variables = 0
+
+        # per variable, indexed from 1: value (1 true, -1 false, 0 unassigned),
+        # decision level, reason clause, activity and last value
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+
+        # watches[literal] is the list of clauses watching literal; each
+        # clause watches its first two literals
+        self.watches = dict()
+        self.clauses = []
+        self.learned = []
+
+        # assigned literals in order, and the trail length at the start of
+        # each decision level; `flipped` marks levels whose decision was undone
+        self.trail = []
+        self.limits = []
+        self.flipped = []
+        self.head = 0
+
+        self.order = []
+        self.increment = 1.0
+        self.inconsistent = False
+        self.model = None
+
+        # statistics
+        self.decisions = 0
+        self.propagations = 0
+        self.conflicts = 0
+
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def ensure(self, variable):
+        """Make room for variables up to `variable`."""
+        while self.variables < variable:
+            self.variables += 1
+            self.values.append(0)
+            self.levels.append(0)
+            self.reasons.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            heapq.heappush(self.order, (0.0, self.variables))
+
+    def value(self, literal):
+        """Return 1 if `literal` is true, -1 if it is false, 0 if unassigned."""
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, clause):
+        """
+        Add `clause`, an iterable of literals. Return False if the clauses
+        are now known to be unsatisfiable, True otherwise.
+        """
+        self.backtrack(0)
+        clause = list(dict.fromkeys(clause))
+        literals = set(clause)
+        if any(-literal in literals for literal in clause):
+            return True
+        for literal in clause:
+            self.ensure(abs(literal))
+
+        # only root-level assignments remain, and those are permanent
+        remaining = []
+        for literal in clause:
+            value = self.value(literal)
+            if value == 1:
+                return True
+            if value == 0:
+                remaining.append(literal)
+
+        if not remaining:
+            self.inconsistent = True
+        elif len(remaining) == 1:
+            self.enqueue(remaining[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+        else:
+            self.clauses.append(remaining)
+            self.watch(remaining)
+        return not self.inconsistent
+
+    def watch(self, clause):
+        """Start watching the first two literals of `clause`."""
+        self.watches.setdefault(clause[0], []).append(clause)
+        self.watches.setdefault(clause[1], []).append(clause)
+
+    def enqueue(self, literal, reason):
+        """Make `literal` true at the current level, implied by `reason`."""
+        variable = abs(literal)
+        self.values[variable] = 1 if literal > 0 else -1
+        self.levels[variable] = len(self.limits)
+        self.reasons[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Propagate unit clauses until nothing changes.
+        Return a clause whose literals are all false, or None.
+        """
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches.get(false)
+            if not watching:
+                continue
+            self.propagations += 1
+
+            kept = []
+            for k, clause in enumerate(watching):
+                # keep the false literal in second place
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if self.value(first) == 1:
+                    kept.append(clause)
+                    continue
+
+                # look for another literal to watch that is not false
+                for m in range(2, len(clause)):
+                    if self.value(clause[m]) != -1:
+                        clause[1], clause[m] = clause[m], clause[1]
+                        self.watches.setdefault(clause[1], []).append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if self.value(first) == -1:
+                        kept.extend(watching[k + 1:])
+                        self.watches[false] = kept
+                        self.head = len(self.trail)
+                        return clause
+                    self.enqueue(first, clause)
+            self.watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Derive a learned clause from `conflict` by resolving on literals of
+        the current level until one remains (the first unique implication
+        point). Return the clause, with its asserting literal first, and the
+        level to jump back to.
+        """
+        learned = [None]
+        seen = set()
+        level = len(self.limits)
+        pending = 0
+        literal = None
+        clause = conflict
+        index = len(self.trail) - 1
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable not in seen and self.levels[variable] > 0:
+                    seen.add(variable)
+                    self.bump(variable)
+                    if self.levels[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # the next literal to resolve on is the latest one seen on the trail
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reasons[abs(literal)]
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        # watch the literal from the highest remaining level second
+        highest = max(range(1, len(learned)), key=lambda k: self.levels[abs(learned[k])])
+        learned[1], learned[highest] = learned[highest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, variable):
+        """Raise the activity of a variable involved in a conflict."""
+        self.activity[variable] += self.increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.order = [
+                (-self.activity[v], v)
+                for v in range(1, self.variables + 1)
+                if not self.values[v]
+            ]
+            heapq.heapify(self.order)
+
+    def backtrack(self, level):
+        """Undo every assignment made above decision level `level`."""
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            variable = abs(literal)
+            self.phase[variable] = literal > 0
+            self.values[variable] = 0
+            self.reasons[variable] = None
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        del self.flipped[level:]
+        self.head = len(self.trail)
+
+        # stale entries pile up in the heap; rebuild it once they dominate
+        if len(self.order) > 4 * self.variables:
+            self.order = [
+                (-self.activity[v], v)
+                for v in range(1, self.variables + 1)
+                if not self.values[v]
+            ]
+            heapq.heapify(self.order)
+
+    def flip(self, protected):
+        """
+        Chronological backtracking for DPLL: undo up to the most recent
+        decision not yet flipped and assert its opposite. The first
+        `protected` levels (assumptions) are never flipped.
+        Return False if no decision is left to flip.
+        """
+        while len(self.limits) > protected:
+            level = len(self.limits) - 1
+            decision = self.trail[self.limits[level]]
+            flipped = self.flipped[level]
+            self.backtrack(level)
+            if not flipped:
+                self.limits.append(len(self.trail))
+                self.flipped.append(True)
+                self.enqueue(-decision, None)
+                return True
+        if protected == 0:
+            self.inconsistent = True
+        return False
+
+    def pick(self):
+        """Return the unassigned variable with the highest activity, or None."""
+        while self.order:
+            _, variable = heapq.heappop(self.order)
+            if not self.values[variable]:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Return True if the clauses are satisfiable with every literal in
+        `assumptions` true, False otherwise. If True, `self.model` maps each
+        variable to its value in a satisfying assignment.
+        """
+        self.model = None
+        if self.inconsistent:
+            return False
+        self.backtrack(0)
+        assumptions = list(assumptions)
+        for literal in assumptions:
+            self.ensure(abs(literal))
+
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.limits:
+                    self.inconsistent = True
+                    return False
+                if not self.learn:
+                    if not self.flip(len(assumptions)):
+                        return False
+                    continue
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], None)
+                else:
+                    self.learned.append(learned)
+                    self.watch(learned)
+                    self.enqueue(learned[0], learned)
+                self.increment /= 0.95
+                continue
+
+            # assumptions are decided first, one per level
+            level = len(self.limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                value = self.value(literal)
+                if value == -1:
+                    return False
+                self.limits.append(len(self.trail))
+                self.flipped.append(True)
+                if value == 0:
+                    self.enqueue(literal, None)
+                continue
+
+            variable = self.pick()
+            if variable is None:
+                self.model = {
+                    v: self.values[v] == 1 for v in range(1, self.variables + 1)
+                }
+                return True
+            self.decisions += 1
+            self.limits.append(len(self.trail))
+            self.flipped.append(False)
+            self.enqueue(variable if self.phase[variable] else -variable, None)
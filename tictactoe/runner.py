@@ -17,6 +17,9 @@ mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
 moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
 
+# Solve every position up front, so each computer move is a table lookup
+ttt.warm_up()
+
 user = None
 board = ttt.initial_state()
 ai_turn = False
@@ -1,16 +1,61 @@
 """
 Tic Tac Toe Player
+
+Boards are nested lists, as used by runner.py, on the outside. Inside,
+the game is played on bitboards: a pair (x, o) of 9-bit masks with bit
+3 * i + j set when that player holds cell (i, j).
 """
 
+import json
 import math
-from copy import deepcopy
-import copy
+import os
 
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Every cell set
+FULL = 0b111111111
+
+# The eight lines of three cells: rows, columns and diagonals
+WINS = [
+    0b000000111, 0b000111000, 0b111000000,
+    0b001001001, 0b010010010, 0b100100100,
+    0b100010001, 0b001010100
+]
+
+# Number of set bits of every 9-bit mask
+POPCOUNT = [bin(mask).count("1") for mask in range(FULL + 1)]
+
+# Where each cell (i, j) goes under the eight rotations and reflections
+CELL_MAPS = [
+    lambda i, j: (i, j), lambda i, j: (j, 2 - i),
+    lambda i, j: (2 - i, 2 - j), lambda i, j: (2 - j, i),
+    lambda i, j: (i, 2 - j), lambda i, j: (2 - i, j),
+    lambda i, j: (j, i), lambda i, j: (2 - j, 2 - i)
+]
+
+# For each symmetry, the image of every 9-bit mask
+SYMMETRIES = [
+    [
+        sum(
+            1 << (3 * cell_map(*divmod(cell, 3))[0] + cell_map(*divmod(cell, 3))[1])
+            for cell in range(9) if mask >> cell & 1
+        )
+        for mask in range(FULL + 1)
+    ]
+    for cell_map in CELL_MAPS
+]
+
+# Transposition table: canonical position, shifted left with the low bit
+# set when the minimizing player is to move -> (value, bound), where bound
+# says whether value is the exact minimax value or a lower or upper bound
+EXACT = 0
+LOWER = 1
+UPPER = 2
+TABLE = dict()
+
 
 def initial_state():
     """
@@ -21,105 +66,78 @@ def initial_state():
             [EMPTY, EMPTY, EMPTY]]
 
 
+def encode(board):
+    """
+    Returns the bitboard (x, o) of a nested-list board.
+    """
+    x = o = 0
+    for i in range(3):
+        for j in range(3):
+            if board[i][j] == X:
+                x |= 1 << (3 * i + j)
+            elif board[i][j] == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def decode(x, o):
+    """
+    Returns the nested-list board of the bitboard (x, o).
+    """
+    return [
+        [
+            X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY
+            for j in range(3)
+        ]
+        for i in range(3)
+    ]
+
+
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    if board == initial_state():
-        return X
-    
-    X_count = 0
-    O_count = 0
-    for row in board:
-        for cells in board:
-            X_count += row.count(X)
-            O_count += row.count(O)
-
-    if X_count > O_count:
+    # as before bitboards, O is named whenever X is a move ahead, even once
+    # the game is over; otherwise X moves next unless the game is over
+    x, o = encode(board)
+    if POPCOUNT[x] > POPCOUNT[o]:
         return O
-    elif O_count == X_count and not terminal(board):
+    elif POPCOUNT[x] == POPCOUNT[o] and not bit_terminal(x, o):
         return X
-    else:
-        return None
+    return None
 
 
 def actions(board):
     """
-    Returns set of all possible actions (i, j) available on the board. set possible actions as an empty set initially
-    (i, j) range values range(3) == 0,1,2
+    Returns set of all possible actions (i, j) available on the board.
     """
-    valid_actions = set()
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                valid_actions.add((i, j))
-    return valid_actions
-    
+    x, o = encode(board)
+    return {divmod(cell, 3) for cell in bit_actions(x, o)}
+
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    r_board = copy.deepcopy(board)
-    if action not in actions(board):
+    i, j = action
+    if not (0 <= i < 3 and 0 <= j < 3):
         raise Exception("space occupied")
-    else:
-        r_board = copy.deepcopy(board)
-        r_board[action[0]][action[1]] = player(board)
-        return r_board
+    x, o = encode(board)
+    return decode(*bit_result(x, o, 3 * i + j))
 
 
 def winner(board):
     """
-    Returns the winner of the game, if there is one. 
-    Note the space of columns, check the rows, i, and columns, j, and diagonals
+    Returns the winner of the game, if there is one.
     """
-    columns = [] 
-    for row in board:
-        X_counter = row.count(X)
-        O_counter = row.count(O)
-        if X_counter == 3:
-            return X
-        if O_counter == 3:
-            return O
+    return bit_winner(*encode(board))
 
-    for j in range(len(board)):
-        column = [row[j] for row in board]
-        columns.append(column)
-
-    for j in columns:
-        X_counter = j.count(X)
-        O_counter = j.count(O)
-        if X_counter == 3:
-            return X
-        if O_counter == 3:
-            return O
-
-    if board[0][0] == O and board[1][1] == O and board[2][2] == O:
-        return O
-    if board[0][2] == O and board[1][1] == O and board[2][0] == O:
-        return O
-    if board[0][0] == X and board[1][1] == X and board[2][2] == X:
-        return X
-    if board[0][2] == X and board[1][1] == X and board[2][0] == X:
-        return X
-    
-    return None
 
-                
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    if winner(board) is not None:
-        return True
-
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] == EMPTY:
-                return False
-
-    return True
+    return bit_terminal(*encode(board))
 
 
 def utility(board):
@@ -127,78 +145,255 @@ def utility(board):
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     Assuming utility will only be called on a board if terminal(board) True
     """
-    if winner(board) == X:
-        return 1
-    elif winner(board) == O:
-        return -1
-    else:
-        return 0 
+    return bit_utility(*encode(board))
 
 
 def minimax(board):
     """
     Returns the optimal action for the current player on the board.
-    v = -math.inf for current.player X because returning max
     """
-    if terminal(board):
+    action = bit_minimax(*encode(board))
+    return None if action is None else divmod(action, 3)
+
+
+def max_value(board):
+    """
+    Returns the best utility X, the maximizing player, can force from the board.
+    """
+    return bit_max_value(*encode(board))
+
+
+def min_value(board):
+    """
+    Returns the best utility O, the minimizing player, can force from the board.
+    """
+    return bit_min_value(*encode(board))
+
+
+def bit_player(x, o):
+    """
+    Returns the player to move on the bitboard: X moves first, so it is
+    X's turn whenever both have made the same number of moves.
+    """
+    return X if POPCOUNT[x] == POPCOUNT[o] else O
+
+
+def bit_actions(x, o):
+    """
+    Returns the list of empty cells of the bitboard, as bit numbers.
+    """
+    free = FULL & ~(x | o)
+    return [cell for cell in range(9) if free >> cell & 1]
+
+
+def bit_result(x, o, cell):
+    """
+    Returns the bitboard after the player to move takes `cell`.
+    """
+    move = 1 << cell
+    if (x | o) & move:
+        raise Exception("space occupied")
+    if POPCOUNT[x] == POPCOUNT[o]:
+        return x | move, o
+    return x, o | move
+
+
+def bit_winner(x, o):
+    """
+    Returns the player holding a whole line of the bitboard, if there is one.
+    """
+    for line in WINS:
+        if x & line == line:
+            return X
+        if o & line == line:
+            return O
+    return None
+
+
+def bit_terminal(x, o):
+    """
+    Returns True if the game on the bitboard is over, False otherwise.
+    """
+    return (x | o) == FULL or bit_winner(x, o) is not None
+
+
+def bit_utility(x, o):
+    """
+    Returns 1 if X has won on the bitboard, -1 if O has won, 0 otherwise.
+    """
+    won = bit_winner(x, o)
+    if won == X:
+        return 1
+    elif won == O:
+        return -1
+    return 0
+
+
+def bit_minimax(x, o):
+    """
+    Returns the optimal cell for the player to move on the bitboard, or
+    None if the game is over.
+    """
+    if bit_terminal(x, o):
         return None
-    
-    if player(board) == X:
+
+    # a move no better than the best so far only needs a bound, so the
+    # best value found narrows the window of the moves after it
+    if bit_player(x, o) == X:
         best = -math.inf
         optimal_action = None
-        
-        for action in actions(board):
-            min_v = min_value(result(board, action))
-            if min_v > best:
-                best = min_v
-                optimal_action = action
-
+        for cell in bit_actions(x, o):
+            value = bit_min_value(*bit_result(x, o, cell), best, math.inf)
+            if value > best:
+                best = value
+                optimal_action = cell
+                if best == 1:
+                    break
         return optimal_action
-    
-    elif player(board) == O:
-        best = math.inf
-        optimal_action = None
 
-        for action in actions(board):
-            max_v = max_value(result(board, action))
-            if max_v < best:
-                best = max_v
-                optimal_action = action
-        
-        return optimal_action
+    best = math.inf
+    optimal_action = None
+    for cell in bit_actions(x, o):
+        value = bit_max_value(*bit_result(x, o, cell), -math.inf, best)
+        if value < best:
+            best = value
+            optimal_action = cell
+            if best == -1:
+                break
+    return optimal_action
 
 
-def max_value(board): # recursive
+def bit_max_value(x, o, alpha=-math.inf, beta=math.inf):
+    """
+    Returns the best utility the maximizing player can force from the
+    bitboard, if it lies between alpha and beta; otherwise a bound on it
+    beyond the window, which is all the caller needs.
+    """
 
-    if terminal(board):
-        return utility(board)
+    if bit_terminal(x, o):
+        return bit_utility(x, o)
+    key = canonical(x, o) << 1
+    value = lookup(key, alpha, beta)
+    if value is not None:
+        return value
 
+    start = alpha
     optimal = -math.inf
+    for cell in bit_actions(x, o):
+        optimal = max(optimal, bit_min_value(*bit_result(x, o, cell), alpha, beta))
+        if optimal >= beta or optimal == 1:
+            break
+        alpha = max(alpha, optimal)
+    remember(key, optimal, start, beta)
+    return optimal
+
 
-    for action in actions(board):
-        optimal = max(optimal, min_value(result(board, action)))
+def bit_min_value(x, o, alpha=-math.inf, beta=math.inf):
+    """
+    Returns the best utility the minimizing player can force from the
+    bitboard, if it lies between alpha and beta; otherwise a bound on it
+    beyond the window, which is all the caller needs.
+    """
 
+    if bit_terminal(x, o):
+        return bit_utility(x, o)
+    key = canonical(x, o) << 1 | 1
+    value = lookup(key, alpha, beta)
+    if value is not None:
+        return value
+
+    start = beta
+    optimal = math.inf
+    for cell in bit_actions(x, o):
+        optimal = min(optimal, bit_max_value(*bit_result(x, o, cell), alpha, beta))
+        if optimal <= alpha or optimal == -1:
+            break
+        beta = min(beta, optimal)
+    remember(key, optimal, alpha, start)
     return optimal
 
 
-def min_value(board):
+def canonical(x, o):
+    """
+    Returns one number for the bitboard and all its rotations and
+    reflections, which share their minimax value: the smallest of their
+    codes x + 2^9 o.
+    """
+    return min(symmetry[x] | symmetry[o] << 9 for symmetry in SYMMETRIES)
 
-    if terminal(board):
-        return utility(board)
 
-    optimal = math.inf
+def lookup(key, alpha, beta):
+    """
+    Returns the value of a position from the transposition table if the
+    entry settles it for the window (alpha, beta), or None.
+    """
+    entry = TABLE.get(key)
+    if entry is None:
+        return None
+    value, bound = entry
+    if (bound == EXACT
+            or (bound == LOWER and value >= beta)
+            or (bound == UPPER and value <= alpha)):
+        return value
+    return None
 
-    for action in actions(board):
-        optimal = min(optimal, max_value(result(board, action)))
 
-    return optimal
-    
-    optimal = float(-math.inf)
-    for action in actions(board):
-        best = min_value(result(board, action))
-        if best > optimal:
-            optimal = best
-            if optimal == 1:
-                return optimal
-    return optimal
+def remember(key, value, alpha, beta):
+    """
+    Stores the value a search of the window (alpha, beta) found for a
+    position: outside the window it is only a bound on the true value.
+    """
+    if value <= alpha:
+        TABLE[key] = (value, UPPER)
+    elif value >= beta:
+        TABLE[key] = (value, LOWER)
+    else:
+        TABLE[key] = (value, EXACT)
+
+
+def warm_up(filename=None):
+    """
+    Fills the transposition table with the exact value of every reachable
+    position, so that each later move is a table lookup. If `filename`
+    names a saved table it is loaded instead; otherwise, given a
+    filename, the solved table is saved there.
+    """
+    if filename and os.path.exists(filename):
+        load_table(filename)
+        return
+
+    positions = [(0, 0)]
+    seen = {canonical(0, 0)}
+    while positions:
+        x, o = positions.pop()
+        if bit_terminal(x, o):
+            continue
+        if bit_player(x, o) == X:
+            bit_max_value(x, o)
+        else:
+            bit_min_value(x, o)
+        for cell in bit_actions(x, o):
+            child = bit_result(x, o, cell)
+            if canonical(*child) not in seen:
+                seen.add(canonical(*child))
+                positions.append(child)
+
+    if filename:
+        save_table(filename)
+
+
+def save_table(filename):
+    """
+    Saves the transposition table as JSON.
+    """
+    with open(filename, "w") as f:
+        json.dump([[key, value, bound] for key, (value, bound) in TABLE.items()], f)
 
+
+def load_table(filename):
+    """
+    Adds the entries of a transposition table saved by `save_table`.
+    """
+    with open(filename) as f:
+        for key, value, bound in json.load(f):
+            TABLE[key] = (value, bound)